@@ -0,0 +1,547 @@
+# Date: 10/18/2026
+# Description: Bitboard position backend for XiangqiGame.
+# A position is stored as 90-bit Python integers, one bitboard per colour and piece kind, where
+# bit (row * 9 + column) is set when that square is occupied. Attack masks for the General, Advisor,
+# Elephant, Horse and Soldier are precomputed per square together with their blocking squares (the
+# Elephant's eye and the Horse's leg), and Chariot and Cannon rays are looked up from tables indexed by
+# the occupancy of the rank or file the piece stands on. Check detection and move generation then take
+# a handful of AND/OR operations instead of a loop over squares. GEOMETRY collects the same masks per colour
+# and piece kind as the squares each piece may move to on an empty board, for the piece rule checks.
+
+# piece kinds, used to index the per-colour bitboards
+GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT, CANNON, SOLDIER = range(7)
+
+_ROW = [index // 9 for index in range(90)]
+_COLUMN = [index % 9 for index in range(90)]
+
+
+def _on_board(row, column):
+    """
+    Returns True if row and column are on the 10 x 9 board
+    """
+    return 0 <= row <= 9 and 0 <= column <= 8
+
+
+def _in_palace(color, row, column):
+    """
+    Returns True if row and column are inside color's palace
+    """
+    if color == "red":
+        return 0 <= row <= 2 and 3 <= column <= 5
+    return 7 <= row <= 9 and 3 <= column <= 5
+
+
+def _on_own_side(color, row):
+    """
+    Returns True if row is on color's side of the river
+    """
+    if color == "red":
+        return row <= 4
+    return row >= 5
+
+
+def _build_step_masks(steps, allowed):
+    """
+    Returns {color: [mask per square]} of the squares one of steps away, where both squares satisfy
+    allowed(color, row, column)
+    """
+    masks = {}
+    for color in ("red", "black"):
+        masks[color] = []
+        for index in range(90):
+            mask = 0
+            for row_step, column_step in steps:
+                row = _ROW[index] + row_step
+                column = _COLUMN[index] + column_step
+                if _on_board(row, column) and allowed(color, row, column) and \
+                        allowed(color, _ROW[index], _COLUMN[index]):
+                    mask |= 1 << (row * 9 + column)
+            masks[color].append(mask)
+    return masks
+
+
+def _build_elephant_moves():
+    """
+    Returns {color: [[(eye_bit, target_bit), ...] per square]} for Elephants that stay on their side of the river
+    """
+    moves = {}
+    for color in ("red", "black"):
+        moves[color] = []
+        for index in range(90):
+            entries = []
+            for row_step, column_step in ((2, 2), (2, -2), (-2, 2), (-2, -2)):
+                row = _ROW[index] + row_step
+                column = _COLUMN[index] + column_step
+                if _on_board(row, column) and _on_own_side(color, row) and _on_own_side(color, _ROW[index]):
+                    eye = index + 9 * (row_step // 2) + column_step // 2
+                    entries.append((1 << eye, 1 << (row * 9 + column)))
+            moves[color].append(entries)
+    return moves
+
+
+def _build_horse_tables():
+    """
+    Returns (moves, attackers): moves[square] lists (leg_bit, targets) for the two targets behind each leg of a
+    Horse on square, and attackers[square] lists (leg_bit, sources) for the Horse squares that reach square
+    through that leg
+    """
+    moves = []
+    attackers = []
+    for index in range(90):
+        row = _ROW[index]
+        column = _COLUMN[index]
+
+        # a Horse steps orthogonally onto its leg, then diagonally outwards
+        entries = []
+        for leg_row, leg_column in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            if not _on_board(row + leg_row, column + leg_column):
+                continue
+            targets = 0
+            for side in (1, -1):
+                target_row = row + 2 * leg_row + side * leg_column
+                target_column = column + 2 * leg_column + side * leg_row
+                if _on_board(target_row, target_column):
+                    targets |= 1 << (target_row * 9 + target_column)
+            if targets:
+                entries.append((1 << ((row + leg_row) * 9 + column + leg_column), targets))
+        moves.append(entries)
+
+        # a Horse reaching square passes over a leg diagonally adjacent to square
+        entries = []
+        for leg_row, leg_column in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+            if not _on_board(row + leg_row, column + leg_column):
+                continue
+            sources = 0
+            for source_row, source_column in ((row + 2 * leg_row, column + leg_column),
+                                              (row + leg_row, column + 2 * leg_column)):
+                if _on_board(source_row, source_column):
+                    sources |= 1 << (source_row * 9 + source_column)
+            if sources:
+                entries.append((1 << ((row + leg_row) * 9 + column + leg_column), sources))
+        attackers.append(entries)
+    return moves, attackers
+
+
+def _build_soldier_tables():
+    """
+    Returns (moves, attackers): moves[color][square] is the Soldier's forward step plus its sideways steps once
+    across the river, and attackers[color][square] is the set of squares from which color's Soldiers reach square
+    """
+    moves = {}
+    attackers = {}
+    for color in ("red", "black"):
+        forward = 1 if color == "red" else -1
+        moves[color] = []
+        attackers[color] = [0] * 90
+        for index in range(90):
+            row = _ROW[index]
+            column = _COLUMN[index]
+            mask = 0
+            steps = [(forward, 0)]
+            if not _on_own_side(color, row):
+                steps += [(0, 1), (0, -1)]
+            for row_step, column_step in steps:
+                if _on_board(row + row_step, column + column_step):
+                    target = (row + row_step) * 9 + column + column_step
+                    mask |= 1 << target
+                    attackers[color][target] |= 1 << index
+            moves[color].append(mask)
+    return moves, attackers
+
+
+def _build_line_tables(length):
+    """
+    Returns (rays, cannon) tables for a line of length points, indexed [position][occupancy] where occupancy has
+    one bit per point: rays holds the points a Chariot reaches (empty points up to and including the first piece
+    each way), and cannon holds the points a Cannon captures (the first piece beyond exactly one screen)
+    """
+    rays = []
+    cannon = []
+    for position in range(length):
+        rays.append([0] * (1 << length))
+        cannon.append([0] * (1 << length))
+        for occupancy in range(1 << length):
+            ray_mask = 0
+            cannon_mask = 0
+            for step in (1, -1):
+                point = position + step
+                screen = False
+                while 0 <= point < length:
+                    if occupancy >> point & 1:
+                        if screen:
+                            cannon_mask |= 1 << point
+                            break
+                        ray_mask |= 1 << point
+                        screen = True
+                    elif not screen:
+                        ray_mask |= 1 << point
+                    point += step
+            rays[position][occupancy] = ray_mask
+            cannon[position][occupancy] = cannon_mask
+    return rays, cannon
+
+
+def _build_file_spread():
+    """
+    Returns [bitboard per 10-bit file mask] placing bit row of the mask on square row * 9 of file a
+    """
+    spread = []
+    for mask in range(1 << 10):
+        bitboard = 0
+        for row in range(10):
+            if mask >> row & 1:
+                bitboard |= 1 << (row * 9)
+        spread.append(bitboard)
+    return spread
+
+
+def _build_neighbours(steps):
+    """
+    Returns [bitboard per square] of the squares one of steps away from it
+    """
+    neighbours = []
+    for index in range(90):
+        mask = 0
+        for row_step, column_step in steps:
+            if _on_board(_ROW[index] + row_step, _COLUMN[index] + column_step):
+                mask |= 1 << ((_ROW[index] + row_step) * 9 + _COLUMN[index] + column_step)
+        neighbours.append(mask)
+    return neighbours
+
+
+def _build_between():
+    """
+    Returns [from square][to square] bitboards of the squares strictly between two squares on the same rank or
+    file, and 0 for any other pair
+    """
+    between = [[0] * 90 for index in range(90)]
+    for first in range(90):
+        for second in range(90):
+            if _ROW[first] == _ROW[second]:
+                step = 1
+            elif _COLUMN[first] == _COLUMN[second]:
+                step = 9
+            else:
+                continue
+            low, high = min(first, second), max(first, second)
+            for square in range(low + step, high, step):
+                between[first][second] |= 1 << square
+    return between
+
+
+def _build_points(moves, starts):
+    """
+    Returns {color: [mask per square]} keeping moves[color][square] only for the squares color's piece can reach
+    from its starting squares starts[color], so that the Advisor's five and the Elephant's seven points follow
+    from the move rules instead of a hand-written list
+    """
+    points = {}
+    for color in ("red", "black"):
+        reached = set(starts[color])
+        frontier = list(starts[color])
+        while frontier:
+            square = frontier.pop()
+            for target in range(90):
+                if moves[color][square] >> target & 1 and target not in reached:
+                    reached.add(target)
+                    frontier.append(target)
+        points[color] = [moves[color][square] if square in reached else 0 for square in range(90)]
+    return points
+
+
+def _build_geometry():
+    """
+    Returns [color][kind][square] bitboards of the squares color's piece of kind may move to from square on an
+    empty board: the palace and elephant points, the river limits, the Soldier's forward and sideways steps and
+    every Horse target whatever its leg, with Chariots and Cannons reaching their whole rank and file
+    """
+    geometry = {}
+    for color in ("red", "black"):
+        horse = [0] * 90
+        for index in range(90):
+            for leg, targets in HORSE_MOVES[index]:
+                horse[index] |= targets
+        lines = [LINES[index] ^ (1 << index) for index in range(90)]
+        geometry[color] = (GENERAL_MOVES[color], ADVISOR_MOVES[color], ELEPHANT_TARGETS[color], horse, lines, lines,
+                           SOLDIER_MOVES[color])
+    return geometry
+
+
+GENERAL_MOVES = _build_step_masks(((1, 0), (-1, 0), (0, 1), (0, -1)), _in_palace)
+# Advisors never leave the diagonals of the palace, and Elephants never leave their seven points
+ADVISOR_MOVES = _build_points(_build_step_masks(((1, 1), (1, -1), (-1, 1), (-1, -1)), _in_palace),
+                              {"red": (3, 5), "black": (84, 86)})
+_ELEPHANT_STEPS = _build_elephant_moves()
+ELEPHANT_TARGETS = _build_points({color: [sum(target for eye, target in entries) for entries in _ELEPHANT_STEPS[color]]
+                                 for color in ("red", "black")}, {"red": (2, 6), "black": (83, 87)})
+ELEPHANT_MOVES = {color: [entries if ELEPHANT_TARGETS[color][index] else [] for index, entries in
+                          enumerate(_ELEPHANT_STEPS[color])] for color in ("red", "black")}
+HORSE_MOVES, HORSE_ATTACKERS = _build_horse_tables()
+SOLDIER_MOVES, SOLDIER_ATTACKERS = _build_soldier_tables()
+RANK_RAYS, RANK_CANNON = _build_line_tables(9)
+FILE_RAYS, FILE_CANNON = _build_line_tables(10)
+FILE_SPREAD = _build_file_spread()
+
+# the rank and file through each square, the only squares whose occupancy decides whether a Chariot, Cannon
+# or the other General attacks it, and its diagonal neighbours, where the legs of Horses attacking it stand
+LINES = [(0x1FF << (_ROW[index] * 9)) | (FILE_SPREAD[0x3FF] << _COLUMN[index]) for index in range(90)]
+DIAGONAL_NEIGHBOURS = _build_neighbours(((1, 1), (1, -1), (-1, 1), (-1, -1)))
+BETWEEN = _build_between()
+GEOMETRY = _build_geometry()
+
+
+class BitboardPosition:
+    """
+    Represents a position with _pieces, _occupied, _all_occupied, _rank_occupancy and _file_occupancy data members.
+    _pieces[color][kind] is the bitboard of color's pieces of that kind, _occupied[color] the union of color's
+    pieces, and _rank_occupancy[row] (9 bits) and _file_occupancy[column] (10 bits) index the ray tables.
+    """
+
+    def __init__(self):
+        """
+        Returns an empty BitboardPosition
+        """
+        self._pieces = {"red": [0] * 7, "black": [0] * 7}
+        self._occupied = {"red": 0, "black": 0}
+        self._all_occupied = 0
+        self._rank_occupancy = [0] * 10
+        self._file_occupancy = [0] * 9
+
+    def get_pieces(self, color, kind):
+        """
+        Returns the bitboard of color's pieces of kind
+        """
+        return self._pieces[color][kind]
+
+    def get_occupied(self, color=None):
+        """
+        Returns the bitboard of color's pieces, or of all pieces if color is None
+        """
+        if color is None:
+            return self._all_occupied
+        return self._occupied[color]
+
+    def add_piece(self, color, kind, square):
+        """
+        Places color's piece of kind on the empty square
+        """
+        bit = 1 << square
+        self._pieces[color][kind] |= bit
+        self._occupied[color] |= bit
+        self._all_occupied |= bit
+        self._rank_occupancy[_ROW[square]] |= 1 << _COLUMN[square]
+        self._file_occupancy[_COLUMN[square]] |= 1 << _ROW[square]
+
+    def remove_piece(self, color, kind, square):
+        """
+        Removes color's piece of kind from square
+        """
+        bit = 1 << square
+        self._pieces[color][kind] ^= bit
+        self._occupied[color] ^= bit
+        self._all_occupied ^= bit
+        self._rank_occupancy[_ROW[square]] ^= 1 << _COLUMN[square]
+        self._file_occupancy[_COLUMN[square]] ^= 1 << _ROW[square]
+
+    def move_piece(self, color, kind, from_square, to_square):
+        """
+        Moves color's piece of kind from from_square to the empty to_square
+        """
+        self.remove_piece(color, kind, from_square)
+        self.add_piece(color, kind, to_square)
+
+    def chariot_attacks(self, square):
+        """
+        Returns the bitboard of squares a Chariot on square reaches: empty squares up to and including
+        the first piece in each direction
+        """
+        row = _ROW[square]
+        column = _COLUMN[square]
+        return ((RANK_RAYS[column][self._rank_occupancy[row]] << (row * 9)) |
+                (FILE_SPREAD[FILE_RAYS[row][self._file_occupancy[column]]] << column))
+
+    def cannon_captures(self, square):
+        """
+        Returns the bitboard of squares a Cannon on square captures: the first piece beyond exactly one screen
+        """
+        row = _ROW[square]
+        column = _COLUMN[square]
+        return ((RANK_CANNON[column][self._rank_occupancy[row]] << (row * 9)) |
+                (FILE_SPREAD[FILE_CANNON[row][self._file_occupancy[column]]] << column))
+
+    def chariot_reaches(self, square, target):
+        """
+        Returns True if a Chariot on square reaches target, on the same rank or file, with no pieces between them,
+        looking up only the rank or file they share
+        """
+        row = _ROW[square]
+        if row == _ROW[target]:
+            return RANK_RAYS[_COLUMN[square]][self._rank_occupancy[row]] >> _COLUMN[target] & 1 == 1
+        return FILE_RAYS[row][self._file_occupancy[_COLUMN[square]]] >> _ROW[target] & 1 == 1
+
+    def cannon_reaches(self, square, target):
+        """
+        Returns True if a Cannon on square captures on target, on the same rank or file, over exactly one screen,
+        looking up only the rank or file they share
+        """
+        row = _ROW[square]
+        if row == _ROW[target]:
+            return RANK_CANNON[_COLUMN[square]][self._rank_occupancy[row]] >> _COLUMN[target] & 1 == 1
+        return FILE_CANNON[row][self._file_occupancy[_COLUMN[square]]] >> _ROW[target] & 1 == 1
+
+    def horse_attacks(self, square):
+        """
+        Returns the bitboard of squares a Horse on square reaches through unblocked legs
+        """
+        attacks = 0
+        for leg, targets in HORSE_MOVES[square]:
+            if not self._all_occupied & leg:
+                attacks |= targets
+        return attacks
+
+    def elephant_attacks(self, color, square):
+        """
+        Returns the bitboard of squares color's Elephant on square reaches through unblocked eyes
+        """
+        attacks = 0
+        for eye, target in ELEPHANT_MOVES[color][square]:
+            if not self._all_occupied & eye:
+                attacks |= target
+        return attacks
+
+    def get_moves(self, color, kind, square):
+        """
+        Returns the bitboard of pseudo-legal destinations of color's piece of kind on square,
+        excluding squares held by color's own pieces
+        """
+        if kind == CHARIOT:
+            moves = self.chariot_attacks(square)
+        elif kind == CANNON:
+            moves = (self.chariot_attacks(square) & ~self._all_occupied) | self.cannon_captures(square)
+        elif kind == HORSE:
+            moves = self.horse_attacks(square)
+        elif kind == SOLDIER:
+            moves = SOLDIER_MOVES[color][square]
+        elif kind == ELEPHANT:
+            moves = self.elephant_attacks(color, square)
+        elif kind == ADVISOR:
+            moves = ADVISOR_MOVES[color][square]
+        else:
+            moves = GENERAL_MOVES[color][square]
+        return moves & ~self._occupied[color]
+
+    def is_attacked(self, square, by_color):
+        """
+        Returns True if any of by_color's pieces could capture on square
+        """
+        pieces = self._pieces[by_color]
+        if self.chariot_attacks(square) & pieces[CHARIOT]:
+            return True
+        if self.cannon_captures(square) & pieces[CANNON]:
+            return True
+        if SOLDIER_ATTACKERS[by_color][square] & pieces[SOLDIER]:
+            return True
+        if pieces[HORSE]:
+            for leg, sources in HORSE_ATTACKERS[square]:
+                if sources & pieces[HORSE] and not self._all_occupied & leg:
+                    return True
+
+        # the remaining pieces only move inside their own palace or half, where their moves are symmetric
+        if (GENERAL_MOVES[by_color][square] & pieces[GENERAL] or
+                ADVISOR_MOVES[by_color][square] & pieces[ADVISOR] or
+                self.elephant_attacks(by_color, square) & pieces[ELEPHANT]):
+            return True
+        return False
+
+    def generals_facing(self):
+        """
+        Returns True if the two Generals stand on the same file with no pieces between them
+        """
+        red_general = self._pieces["red"][GENERAL]
+        black_general = self._pieces["black"][GENERAL]
+        if not red_general or not black_general:
+            return False
+        return bool(self.chariot_attacks(red_general.bit_length() - 1) & black_general)
+
+    def faces_general(self, color, square, vacated=None):
+        """
+        Returns True if color's General standing on square would face the other General along its file with no
+        pieces between them, taking the vacated square, the one the General leaves, as empty
+        """
+        other_general = self._pieces["black" if color == "red" else "red"][GENERAL].bit_length() - 1
+        column = _COLUMN[square]
+        if other_general < 0 or _COLUMN[other_general] != column:
+            return False
+        occupancy = self._file_occupancy[column]
+        if vacated is not None and _COLUMN[vacated] == column:
+            occupancy &= ~(1 << _ROW[vacated])
+        return FILE_RAYS[_ROW[square]][occupancy] >> _ROW[other_general] & 1 == 1
+
+    def get_checks_and_pins(self, color):
+        """
+        Returns (checkers, evasions, pins, screens) for color's General, so that most of color's moves can be
+        judged without making them:
+        checkers is the bitboard of the other colour's pieces attacking the General, including a facing General;
+        evasions is the bitboard of squares a move other than the General's must leave or enter to possibly end
+        the check (blocking squares, the checker, and a Cannon's screen), or -1 if there are several checkers;
+        pins maps the square of each of color's pieces that would expose the General by leaving its line to it,
+        or by leaving the leg of a Horse aiming at it, to the bitboard of destinations it may still try;
+        screens is the bitboard of empty squares where any piece would become the screen of a Cannon aiming
+        at the General
+        """
+        other = "black" if color == "red" else "red"
+        general = self._pieces[color][GENERAL].bit_length() - 1
+        enemy = self._pieces[other]
+        own = self._occupied[color]
+        occupied = self._all_occupied
+        between = BETWEEN[general]
+
+        checkers = ((self.chariot_attacks(general) & enemy[CHARIOT]) |
+                    (self.cannon_captures(general) & enemy[CANNON]) |
+                    (SOLDIER_ATTACKERS[other][general] & enemy[SOLDIER]))
+        if self.generals_facing():
+            checkers |= enemy[GENERAL]
+        evasions = 0
+        pins = {}
+
+        # Horses aim at the General over a leg diagonally next to it
+        for leg, sources in HORSE_ATTACKERS[general]:
+            horses = sources & enemy[HORSE]
+            if horses:
+                if not occupied & leg:
+                    checkers |= horses
+                    evasions |= leg | horses
+                elif own & leg:
+                    pins[leg.bit_length() - 1] = horses
+
+        # walk each ray from the General up to its third piece: a Cannon first in line sees through the empty
+        # squares before it, a Chariot or General second in line pins a piece of color first in line, and a
+        # Cannon third in line pins color's pieces among its two screens
+        screens = 0
+        for row_step, column_step in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            found = []
+            row = _ROW[general] + row_step
+            column = _COLUMN[general] + column_step
+            while 0 <= row <= 9 and 0 <= column <= 8 and len(found) < 3:
+                if occupied >> (row * 9 + column) & 1:
+                    found.append(row * 9 + column)
+                row += row_step
+                column += column_step
+            if not found:
+                continue
+
+            if enemy[CANNON] >> found[0] & 1:
+                screens |= between[found[0]]
+            elif len(found) > 1 and own >> found[0] & 1 and (enemy[CHARIOT] | enemy[GENERAL]) >> found[1] & 1:
+                pins[found[0]] = pins.get(found[0], -1) & (between[found[1]] | (1 << found[1]))
+            if len(found) > 2 and enemy[CANNON] >> found[2] & 1:
+                for screen in found[:2]:
+                    if own >> screen & 1:
+                        pins[screen] = pins.get(screen, -1) & (between[found[2]] | (1 << found[2]))
+
+        # a single checker is answered by capturing it, blocking its line or leg, or moving its screen away
+        if checkers & (checkers - 1):
+            evasions = -1
+        elif checkers and not checkers & enemy[HORSE]:
+            evasions = between[checkers.bit_length() - 1] | checkers
+        return checkers, evasions, pins, screens
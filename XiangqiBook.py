@@ -0,0 +1,173 @@
+# Date: 10/18/2026
+# Description: Opening book for XiangqiGame, keyed by Zobrist position hash.
+# Writes function build_book and class OpeningBook. build_book replays the opening moves of a corpus of games and
+# writes one entry per position and move played in it, holding the move, a selection weight, the number of games
+# and the score the move earned, sorted by position hash. OpeningBook memory-maps the file and finds the entries
+# of a position by binary search over the hashes, so a book position is answered without search and without
+# loading the book.
+#
+# File layout, all integers little-endian:
+#   header   magic b"XQBK", version (u16), reserved (u16), entry count (u64)
+#   entries  position hash (u64), from square index (u8), to square index (u8), weight (u16), games (u32),
+#            score (u32), sorted by hash and, within a hash, by descending weight
+# score counts two points for each game won and one for each game drawn or not finished by the player making the
+# move, and weight is the score capped at 65535, so moves that only ever lost are kept but never chosen.
+
+import mmap
+import struct
+
+from XiangqiGame import XiangqiGame, SQUARE_INDEX, SQUARE_NAMES
+
+MAGIC = b"XQBK"
+VERSION = 1
+BOOK_HEADER = struct.Struct("<4sHHQ")
+BOOK_ENTRY = struct.Struct("<QBBHII")
+_HASH = struct.Struct("<Q")
+MAX_WEIGHT = 0xFFFF
+
+
+def build_book(path, games, max_ply=20, min_games=1):
+    """
+    Writes an opening book to path from games, an iterable of (moves, result) pairs where moves is a list of
+    (from_square, to_square) moves played from the opening position and result is 'UNFINISHED', 'RED_WON',
+    'BLACK_WON' or 'DRAW', for example the moves and results read by XiangqiRecords.GameRecordReader.
+    Only the first max_ply moves of each game are used, a game's moves are used up to its first illegal move, and
+    moves played in fewer than min_games games are left out. Returns the number of entries written
+    """
+    stats = {}
+    for moves, result in games:
+        game = XiangqiGame()
+        for move in moves[:max_ply]:
+            position_hash = game.position_hash()
+            player = game.get_player_turn()
+            if game.replay([move], "light") is not None:
+                break
+            key = (position_hash, SQUARE_INDEX[move[0]], SQUARE_INDEX[move[1]])
+            if result in ("UNFINISHED", "DRAW"):
+                points = 1
+            elif (result == "RED_WON") == (player == "red"):
+                points = 2
+            else:
+                points = 0
+            entry = stats.get(key)
+            if entry is None:
+                stats[key] = [1, points]
+            else:
+                entry[0] += 1
+                entry[1] += points
+
+    entries = [(position_hash, -min(score, MAX_WEIGHT), from_index, to_index, games_played, score)
+               for (position_hash, from_index, to_index), (games_played, score) in stats.items()
+               if games_played >= min_games]
+    entries.sort()
+    with open(path, "wb") as book_file:
+        book_file.write(BOOK_HEADER.pack(MAGIC, VERSION, 0, len(entries)))
+        for position_hash, weight, from_index, to_index, games_played, score in entries:
+            book_file.write(BOOK_ENTRY.pack(position_hash, from_index, to_index, -weight, games_played, score))
+    return len(entries)
+
+
+class OpeningBook:
+    """
+    Represents an opening book file open for reading with _file, _map and _entry_count data members.
+    Use as a context manager, or call close when done
+    """
+
+    def __init__(self, path):
+        """
+        Opens and memory-maps the book file at path. Raises ValueError if it is not a book written by build_book
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("%s is not an opening book" % path)
+        if len(self._map) < BOOK_HEADER.size:
+            self.close()
+            raise ValueError("%s is not an opening book" % path)
+        magic, version, reserved, self._entry_count = BOOK_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("%s is not a version %d opening book" % (path, VERSION))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._entry_count
+
+    def close(self):
+        """
+        Unmaps and closes the file
+        """
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _find(self, position_hash):
+        """
+        Returns the index of the first entry for position_hash, or of the first entry after where it would be
+        """
+        book_map = self._map
+        low = 0
+        high = self._entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if _HASH.unpack_from(book_map, BOOK_HEADER.size + middle * BOOK_ENTRY.size)[0] < position_hash:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get_entries(self, game):
+        """
+        Returns the book entries for game's position as a list of ((from_square, to_square), weight, games, score)
+        tuples by descending weight, or an empty list if the position is not in the book
+        """
+        position_hash = game.position_hash()
+        entries = []
+        for index in range(self._find(position_hash), self._entry_count):
+            entry_hash, from_index, to_index, weight, games_played, score = \
+                BOOK_ENTRY.unpack_from(self._map, BOOK_HEADER.size + index * BOOK_ENTRY.size)
+            if entry_hash != position_hash:
+                break
+            # a hash collision could bring up a move for another position, so only moves the position allows
+            if self._is_playable(game, from_index, to_index):
+                entries.append(((SQUARE_NAMES[from_index], SQUARE_NAMES[to_index]), weight, games_played, score))
+        return entries
+
+    def _is_playable(self, game, from_index, to_index):
+        """
+        Returns True if the player to move in game has a piece on from_index that may move to to_index under the
+        piece and board rules, without testing whether the move leaves its General in check
+        """
+        player = game.get_player_turn()
+        piece = game._board[from_index]
+        target = game._board[to_index]
+        return piece is not None and piece.get_color() == player and \
+            (target is None or target.get_color() != player) and \
+            piece._is_legal_move(from_index, to_index) is not False and \
+            game._is_valid_move(from_index, to_index) is not False
+
+    def choose_move(self, game, rng=None):
+        """
+        Returns a book move for game's position as a (from_square, to_square) tuple, or None if the position is
+        not in the book or none of its moves has any weight. With rng, a random.Random, the move is drawn with
+        probability proportional to its weight; without it the move with the highest weight is returned
+        """
+        entries = [entry for entry in self.get_entries(game) if entry[1] > 0]
+        if not entries:
+            return None
+        if rng is None:
+            return entries[0][0]
+        pick = rng.randrange(sum(entry[1] for entry in entries))
+        for move, weight, games_played, score in entries:
+            if pick < weight:
+                return move
+            pick -= weight
+        return entries[-1][0]
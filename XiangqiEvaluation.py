@@ -0,0 +1,137 @@
+# Date: 10/18/2026
+# Description: Material and piece-square evaluation for XiangqiGame.
+# Writes functions evaluate, evaluate_full and score_board. Each piece is worth its material value plus a bonus or
+# penalty for the square it stands on, read from a piece-square table per piece kind. SQUARE_SCORES combines the
+# two per colour, piece kind and square, signed from red's point of view, so that XiangqiGame keeps the score of
+# its position up to date in _push and _pop with a few table lookups per move, and evaluate only reads it.
+# evaluate_full computes the same score from the board, for checking the incremental one.
+
+from XiangqiBitboard import GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT, CANNON, SOLDIER
+
+# scores are in hundredths of a soldier
+PIECE_VALUES = {GENERAL: 0, ADVISOR: 200, ELEPHANT: 200, HORSE: 400, CHARIOT: 900, CANNON: 450, SOLDIER: 100}
+
+# piece-square tables for red, one row per rank from row 10 (black's back rank) down to row 1 and files a to i;
+# black's pieces read the square reflected across the river. Squares a piece can never reach are left at 0
+_PIECE_SQUARE_ROWS = {
+    GENERAL: ((0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, -20, -15, -20, 0, 0, 0),
+              (0, 0, 0, -10, -5, -10, 0, 0, 0),
+              (0, 0, 0, -5, 5, -5, 0, 0, 0)),
+    ADVISOR: ((0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, -5, 0, -5, 0, 0, 0),
+              (0, 0, 0, 0, 10, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0)),
+    ELEPHANT: ((0, 0, 0, 0, 0, 0, 0, 0, 0),
+               (0, 0, 0, 0, 0, 0, 0, 0, 0),
+               (0, 0, 0, 0, 0, 0, 0, 0, 0),
+               (0, 0, 0, 0, 0, 0, 0, 0, 0),
+               (0, 0, 0, 0, 0, 0, 0, 0, 0),
+               (0, 0, -5, 0, 0, 0, -5, 0, 0),
+               (0, 0, 0, 0, 0, 0, 0, 0, 0),
+               (-5, 0, 0, 0, 10, 0, 0, 0, -5),
+               (0, 0, 0, 0, 0, 0, 0, 0, 0),
+               (0, 0, 0, 0, 0, 0, 0, 0, 0)),
+    HORSE: ((0, -5, 5, 5, 0, 5, 5, -5, 0),
+            (0, 15, 30, 20, 10, 20, 30, 15, 0),
+            (10, 20, 25, 35, 25, 35, 25, 20, 10),
+            (10, 25, 30, 35, 30, 35, 30, 25, 10),
+            (5, 20, 25, 30, 30, 30, 25, 20, 5),
+            (5, 15, 20, 25, 25, 25, 20, 15, 5),
+            (0, 10, 15, 20, 20, 20, 15, 10, 0),
+            (0, 5, 10, 15, 10, 15, 10, 5, 0),
+            (-10, 0, 5, 5, 0, 5, 5, 0, -10),
+            (-20, -10, -5, -5, -10, -5, -5, -10, -20)),
+    CHARIOT: ((10, 15, 10, 20, 20, 20, 10, 15, 10),
+              (10, 20, 15, 25, 30, 25, 15, 20, 10),
+              (5, 15, 10, 20, 25, 20, 10, 15, 5),
+              (5, 15, 10, 20, 20, 20, 10, 15, 5),
+              (5, 15, 15, 20, 20, 20, 15, 15, 5),
+              (5, 15, 10, 20, 20, 20, 10, 15, 5),
+              (0, 10, 5, 15, 15, 15, 5, 10, 0),
+              (0, 5, 5, 10, 10, 10, 5, 5, 0),
+              (0, 5, 5, 10, 0, 10, 5, 5, 0),
+              (-10, 5, 0, 10, 0, 10, 0, 5, -10)),
+    CANNON: ((10, 10, 0, -5, -10, -5, 0, 10, 10),
+             (5, 5, 0, -5, -5, -5, 0, 5, 5),
+             (5, 5, 0, -5, 0, -5, 0, 5, 5),
+             (0, 5, 5, 5, 10, 5, 5, 5, 0),
+             (0, 0, 5, 5, 10, 5, 5, 0, 0),
+             (0, 5, 5, 5, 15, 5, 5, 5, 0),
+             (0, 0, 5, 5, 15, 5, 5, 0, 0),
+             (5, 5, 10, 10, 20, 10, 10, 5, 5),
+             (0, 5, 5, 5, 10, 5, 5, 5, 0),
+             (0, 0, 5, 10, 10, 10, 5, 0, 0)),
+    # a Soldier gains most of its worth by crossing the river, and is weaker again on the last rank
+    SOLDIER: ((60, 70, 90, 110, 120, 110, 90, 70, 60),
+              (90, 120, 140, 160, 170, 160, 140, 120, 90),
+              (90, 120, 140, 160, 160, 160, 140, 120, 90),
+              (90, 110, 120, 140, 140, 140, 120, 110, 90),
+              (80, 90, 100, 100, 110, 100, 100, 90, 80),
+              (0, 0, 10, 0, 20, 0, 10, 0, 0),
+              (0, 0, -5, 0, 10, 0, -5, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0),
+              (0, 0, 0, 0, 0, 0, 0, 0, 0)),
+}
+
+
+def _build_square_scores():
+    """
+    Returns {color: [kind][square]} holding the material value plus the piece-square bonus of color's piece of
+    kind on square, positive for red and negative for black
+    """
+    return {"red": [[PIECE_VALUES[kind] + PIECE_SQUARE_TABLES[kind][index] for index in range(90)]
+                    for kind in range(7)],
+            "black": [[-PIECE_VALUES[kind] - PIECE_SQUARE_TABLES[kind][(9 - index // 9) * 9 + index % 9]
+                       for index in range(90)] for kind in range(7)]}
+
+
+# PIECE_SQUARE_TABLES[kind][square] is the bonus of red's piece of kind on square
+PIECE_SQUARE_TABLES = {kind: [rows[9 - index // 9][index % 9] for index in range(90)]
+                       for kind, rows in _PIECE_SQUARE_ROWS.items()}
+SQUARE_SCORES = _build_square_scores()
+
+
+def score_board(board):
+    """
+    Returns the score of board, a list of 90 squares holding pieces or None, from red's point of view
+    """
+    score = 0
+    for index in range(90):
+        piece = board[index]
+        if piece is not None:
+            score += SQUARE_SCORES[piece._color][piece._kind][index]
+    return score
+
+
+def evaluate(game):
+    """
+    Returns the material and piece-square score of game's position from the point of view of the side to move,
+    read from the score game keeps up to date move by move
+    """
+    if game._player_turn == "black":
+        return -game._score
+    return game._score
+
+
+def evaluate_full(game):
+    """
+    Returns the score evaluate returns, computed from game's board instead of the kept score
+    """
+    score = score_board(game._board)
+    if game._player_turn == "black":
+        return -score
+    return score
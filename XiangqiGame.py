@@ -9,409 +9,397 @@
 # restrict the movement of some pieces (but enhance that of others);
 # and placement of the pieces on the intersections of the board lines, rather
 # than within the squares.
-# Writes classes XiangqiGame, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier and
+# Writes classes XiangqiGame, Piece, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier and
 # methods within these classes to play Xiangqi
 
+import random
+
+from XiangqiBitboard import BitboardPosition, GEOMETRY, LINES, DIAGONAL_NEIGHBOURS, GENERAL, ADVISOR, ELEPHANT, HORSE, \
+    CHARIOT, CANNON, SOLDIER
+from XiangqiEvaluation import SQUARE_SCORES, score_board
+
+# Squares are numbered 0-89 inside the engine, rank by rank from a1 (0) to i10 (89), so that
+# square index = row * 9 + column. Algebraic strings are only converted at the public methods.
+FILES = "abcdefghi"
+SQUARE_NAMES = [file + str(rank) for rank in range(1, 11) for file in FILES]
+SQUARE_INDEX = {name: index for index, name in enumerate(SQUARE_NAMES)}
+_ROW = [index // 9 for index in range(90)]
+_COLUMN = [index % 9 for index in range(90)]
+
+# Zobrist keys: one 64-bit key per colour, piece kind and square, and one for black to move.
+# A fixed seed keeps position hashes identical across processes and runs.
+_zobrist_random = random.Random(20200312)
+ZOBRIST_PIECES = {color: [[_zobrist_random.getrandbits(64) for index in range(90)] for kind in range(7)]
+                  for color in ("red", "black")}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+
+# FEN piece letters by piece kind, upper case for red and lower case for black; FEN_PIECE_KINDS also accepts
+# the WXF letters e and h for the Elephant and Horse
+FEN_LETTERS = "kabnrcp"
+FEN_PIECE_KINDS = {"k": GENERAL, "a": ADVISOR, "b": ELEPHANT, "e": ELEPHANT, "n": HORSE, "h": HORSE, "r": CHARIOT,
+                   "c": CANNON, "p": SOLDIER}
+STARTING_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+
 
 class XiangqiGame:
     """
-    Represents a XiangqiGame with _the_board, _game_state, _player_turn, _red_general_location,
+    Represents a XiangqiGame with _board, _position, _hash, _score, _repetitions, _repetition_rules, _game_state,
+    _legal_moves, _previous_legal_moves, _undo_stack, _starting_position, _player_turn, _red_general_location,
     _red_in_check, _black_general_location, and _black_in_check data members.
     """
 
     def __init__(self):
         """
-        Returns a XiangqiGame object with initialized _the_board, _game_state, _player_turn, _red_general_location,
-        _red_in_check, _black_general_location, and _black_in_check
+        Returns a XiangqiGame object with initialized _board, _position, _hash, _score, _repetitions,
+        _repetition_rules, _game_state, _legal_moves, _previous_legal_moves, _undo_stack, _starting_position,
+        _player_turn, _red_general_location, _red_in_check, _black_general_location, and _black_in_check
         Locations on the board are specified using "algebraic notation",
         with columns labeled a-i and rows labeled 1-10, with row 1 being the Red side and row 10 the Black side
         """
-        # initializes board with red and black game pieces and labeled rows/ranks and columns/files
-        self._the_board = \
-            [[Chariot("red"), Horse("red"), Elephant("red"),
-              Advisor("red"), General("red"), Advisor("red"),
-              Elephant("red"), Horse("red"), Chariot("red"), "1"],
-             ["", "", "", "", "", "", "", "", "", "2"],
-             ["", Cannon("red"), "", "", "", "", "", Cannon("red"), "", "3"],
-             [Soldier("red"), "", Soldier("red"), "", Soldier("red"),
-              "", Soldier("red"), "", Soldier("red"), "4"],
-             ["", "", "", "", "", "", "", "", "", "5"],
-             ["", "", "", "", "", "", "", "", "", "6"],
-             [Soldier("black"), "", Soldier("black"), "", Soldier("black"),
-              "", Soldier("black"), "", Soldier("black"), "7"],
-             ["", Cannon("black"), "", "", "", "", "", Cannon("black"), "", "8"],
-             ["", "", "", "", "", "", "", "", "", "9"],
-             [Chariot("black"), Horse("black"), Elephant("black"),
-              Advisor("black"), General("black"), Advisor("black"),
-              Elephant("black"), Horse("black"), Chariot("black"), "10"],
-             ["a", "b", "c", "d", "e", "f", "g", "h", "i"]]
-
-        # initializes _game_state
+        # initializes board as a flat list of 90 squares holding a piece or None, indexed by row * 9 + column
+        self._board = [None] * 90
+        # using the shared piece objects from PIECES
+        red, black = PIECES["red"], PIECES["black"]
+        back_rank = (CHARIOT, HORSE, ELEPHANT, ADVISOR, GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT)
+        for column in range(9):
+            self._board[column] = red[back_rank[column]]
+            self._board[81 + column] = black[back_rank[column]]
+        for column in (1, 7):
+            self._board[18 + column] = red[CANNON]
+            self._board[63 + column] = black[CANNON]
+        for column in (0, 2, 4, 6, 8):
+            self._board[27 + column] = red[SOLDIER]
+            self._board[54 + column] = black[SOLDIER]
+
+        # initializes _position, the bitboard view of _board used for move generation and check detection
+        self._position = BitboardPosition()
+        for index in range(90):
+            if self._board[index] is not None:
+                self._position.add_piece(self._board[index].get_color(), self._board[index]._kind, index)
+
+        # initializes _game_state; None means not yet computed for the current position, see get_game_state
         self._game_state = "UNFINISHED"
 
+        # initializes _legal_moves, the legal moves of the current position by from-square index, or None until
+        # they are first needed, see _get_legal_moves, and _previous_legal_moves, the length of the undo stack and
+        # the legal moves of the last position left with its legal moves generated, kept for pop, or None; older
+        # positions regenerate theirs so that the undo stack stays compact
+        self._legal_moves = None
+        self._previous_legal_moves = None
+
+        # initializes _undo_stack, holding one record per move for pop, and _starting_position, the (pieces,
+        # player_turn) the game started from if not the opening position, see _starting_fen
+        self._undo_stack = []
+        self._starting_position = None
+
         # initializes _player_turn
         self._player_turn = "red"
 
-        # initializes _red_general_location and _red_in_check
-        self._red_general_location = "e1"
+        # initializes _red_general_location (square index of e1) and _red_in_check
+        self._red_general_location = SQUARE_INDEX["e1"]
         self._red_in_check = False
 
-        # initializes _black_general_location and _black_in_check
-        self._black_general_location = "e10"
+        # initializes _black_general_location (square index of e10) and _black_in_check
+        self._black_general_location = SQUARE_INDEX["e10"]
         self._black_in_check = False
 
+        # initializes _hash, the Zobrist key of the position, updated incrementally by every move and undo
+        self._hash = self._compute_hash()
+
+        # initializes _score, the material and piece-square score of the position from red's point of view,
+        # updated incrementally like _hash, see XiangqiEvaluation
+        self._score = score_board(self._board)
+
+        # initializes _repetitions, the number of times each position hash has been reached in this game, and
+        # _repetition_rules, whether repeating a position a third time ends the game, see set_repetition_rules
+        self._repetitions = {self._hash: 1}
+        self._repetition_rules = False
+
     def get_the_board(self):
         """
-        Returns _the_board.
+        Returns the board as a list of ranks from row 1 to row 10, each holding pieces or "" for empty squares
+        followed by the rank label, and a final list of file labels.
         """
-        return self._the_board
+        the_board = []
+        for row in range(10):
+            rank = [piece if piece is not None else "" for piece in self._board[row * 9:row * 9 + 9]]
+            rank.append(str(row + 1))
+            the_board.append(rank)
+        the_board.append(list(FILES))
+        return the_board
 
     def print_the_board(self):
         """
-        Returns printed _the_board with a newline for each rank.
+        Returns printed board with a newline for each rank.
         """
-        return print("\n".join(str(rank) for rank in self._the_board))
+        return print("\n".join(str(rank) for rank in self.get_the_board()))
 
     def get_game_state(self):
         """
-        Returns the _game_state; either 'UNFINISHED', 'RED_WON' or 'BLACK_WON'.
+        Returns the _game_state; either 'UNFINISHED', 'RED_WON' or 'BLACK_WON', or 'DRAW' under the repetition rules.
+        The state is computed on first request after each move, checking only whether the player to move is in
+        checkmate or stalemate, from the cached legal moves if get_legal_moves has already generated them, and is
+        kept with the position so that pop restores it without a new scan
+        """
+        if self._game_state is None:
+            if self._legal_moves is not None:
+                has_legal_move = bool(self._legal_moves)
+            else:
+                has_legal_move = self._has_legal_move(self._player_turn)
+            if not has_legal_move:
+                self._game_state = "BLACK_WON" if self._player_turn == "red" else "RED_WON"
+            elif self._repetition_rules and self._repetitions[self._hash] >= 3:
+                self._game_state = self._repetition_result()
+            else:
+                self._game_state = "UNFINISHED"
+        return self._game_state
+
+    def get_known_game_state(self):
+        """
+        Returns the _game_state if it has already been computed for the current position, and otherwise None,
+        without computing it
         """
         return self._game_state
 
+    def repetition_count(self):
+        """
+        Returns the number of times the current position, with the same player to move, has been reached in this
+        game, counting the current time; 1 for a position reached for the first time
+        """
+        return self._repetitions[self._hash]
+
+    def set_repetition_rules(self, enabled=True):
+        """
+        Turns the repetition rules on or off. Under the rules, the game ends when a position is reached for the
+        third time: a player who gave check with every move since the position's last occurrence loses, or else a
+        player who chased a piece with every move loses, and otherwise the game is drawn, see _repetition_result
+        """
+        self._repetition_rules = enabled
+        self._game_state = None
+
+    def _set_game_state(self, game_state):
+        """
+        Keeps game_state as the state of the current position, found elsewhere on a copy of it without this
+        game's history, as by _unpack; under the repetition rules a third occurrence of the position still ends
+        an 'UNFINISHED' game, which only this game's history shows
+        """
+        if game_state == "UNFINISHED" and self._repetition_rules and self._repetitions[self._hash] >= 3:
+            game_state = self._repetition_result()
+        self._game_state = game_state
+
     def get_player_turn(self):
         """
         Returns _player_turn; either "red" or "black"
         """
         return self._player_turn
 
+    def get_legal_moves(self, square=None):
+        """
+        Returns a list of the legal moves of the player whose turn it is as (from_square, to_square) tuples,
+        for example ('b3', 'b10'), or only the moves from square if square is given.
+        Returns an empty list if the game is over or square is not on the board.
+        The moves are computed once per position and kept until the position changes
+        """
+        if self.get_game_state() != "UNFINISHED":
+            return []
+        legal_moves = self._get_legal_moves()
+        if square is None:
+            return [(SQUARE_NAMES[from_index], SQUARE_NAMES[to_index])
+                    for from_index, to_indexes in legal_moves.items() for to_index in to_indexes]
+        if square not in SQUARE_INDEX:
+            return []
+        return [(square, SQUARE_NAMES[to_index]) for to_index in legal_moves.get(SQUARE_INDEX[square], ())]
+
+    def _get_legal_moves(self):
+        """
+        Returns _legal_moves, a dict mapping the from-square index of each legal move of the player whose turn it is
+        to the list of its to-square indexes, generating it on first use for the current position
+        """
+        if self._legal_moves is None:
+            legal_moves = {}
+            for from_index, to_index in self._iterate_legal_moves(self._player_turn):
+                if from_index in legal_moves:
+                    legal_moves[from_index].append(to_index)
+                else:
+                    legal_moves[from_index] = [to_index]
+            self._legal_moves = legal_moves
+        return self._legal_moves
+
+    def position_hash(self):
+        """
+        Returns the 64-bit Zobrist hash of the current position, covering piece placement and whose turn it is
+        """
+        return self._hash
+
+    def _compute_hash(self):
+        """
+        Returns the Zobrist hash of the current position computed from scratch
+        """
+        position_hash = 0
+        for index in range(90):
+            piece = self._board[index]
+            if piece is not None:
+                position_hash ^= ZOBRIST_PIECES[piece.get_color()][piece._kind][index]
+        if self._player_turn == "black":
+            position_hash ^= ZOBRIST_BLACK_TO_MOVE
+        return position_hash
+
+    def _set_position(self, pieces, player_turn):
+        """
+        Replaces the position with pieces, a dict mapping square indexes to pieces, with player_turn to move,
+        and clears the undo stack. pieces is kept, unchanged, as the starting position. Both Generals must be on
+        the board.
+        Sets every data member, so a game built with __new__ instead of the starting array is complete after it
+        """
+        self._board = [None] * 90
+        self._position = BitboardPosition()
+        for index, piece in pieces.items():
+            self._board[index] = piece
+            self._position.add_piece(piece.get_color(), piece._kind, index)
+            if piece._kind == GENERAL:
+                if piece.get_color() == "red":
+                    self._red_general_location = index
+                else:
+                    self._black_general_location = index
+        self._game_state = None
+        self._legal_moves = None
+        self._previous_legal_moves = None
+        self._undo_stack = []
+        self._starting_position = (pieces, player_turn)
+        self._player_turn = player_turn
+        self._red_in_check = False
+        self._black_in_check = False
+        self._hash = self._compute_hash()
+        self._score = score_board(self._board)
+        self._repetitions = {self._hash: 1}
+        self._repetition_rules = False
+
+    def _starting_fen(self):
+        """
+        Returns the FEN of the position the game started from, before the moves on the undo stack, without
+        changing the game
+        """
+        if self._starting_position is None:
+            return STARTING_FEN
+        start = XiangqiGame.__new__(XiangqiGame)
+        start._set_position(*self._starting_position)
+        return start.to_fen()
+
+    def _pack(self):
+        """
+        Returns the position as compact bytes for sending to other processes: one byte for the side to move
+        (0 for red, 1 for black) followed by a (square index, piece code) byte pair per piece, where the piece
+        code is the piece kind, plus 7 for black pieces
+        """
+        packed = bytearray([0 if self._player_turn == "red" else 1])
+        for index in range(90):
+            piece = self._board[index]
+            if piece is not None:
+                packed += bytes((index, piece._kind + (7 if piece.get_color() == "black" else 0)))
+        return bytes(packed)
+
+    @classmethod
+    def _unpack(cls, packed):
+        """
+        Returns a new game at the position serialised by _pack
+        """
+        pieces = {}
+        for offset in range(1, len(packed), 2):
+            code = packed[offset + 1]
+            pieces[packed[offset]] = PIECES["black" if code >= 7 else "red"][code % 7]
+        game = cls.__new__(cls)
+        game._set_position(pieces, "black" if packed[0] else "red")
+        return game
+
+    @classmethod
+    def from_fen(cls, fen):
+        """
+        Returns a new game at the position given by fen, a xiangqi FEN string such as
+        'rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1'.
+        Ranks are listed from row 10 down to row 1 and files from a to i, with upper case letters for red pieces,
+        lower case letters for black pieces and digits for runs of empty squares; the side to move is 'w' or 'r'
+        for red and 'b' for black, and the remaining fields are ignored.
+        Raises ValueError if fen is not a valid position with one General of each color
+        """
+        fields = fen.split()
+        if len(fields) < 2 or fields[1] not in ("w", "r", "b"):
+            raise ValueError("invalid FEN side to move: %r" % (fen,))
+        ranks = fields[0].split("/")
+        if len(ranks) != 10:
+            raise ValueError("FEN must have 10 ranks: %r" % (fen,))
+
+        pieces = {}
+        generals = {"red": 0, "black": 0}
+        for rank_number, rank in enumerate(ranks):
+            index = (9 - rank_number) * 9
+            end = index + 9
+            for letter in rank:
+                if letter in "123456789":
+                    index += int(letter)
+                    continue
+                kind = FEN_PIECE_KINDS.get(letter.lower())
+                if kind is None or index >= end:
+                    raise ValueError("invalid FEN rank %r: %r" % (rank, fen))
+                color = "red" if letter.isupper() else "black"
+                pieces[index] = PIECES[color][kind]
+                if kind == GENERAL:
+                    generals[color] += 1
+                index += 1
+            if index != end:
+                raise ValueError("invalid FEN rank %r: %r" % (rank, fen))
+        if generals["red"] != 1 or generals["black"] != 1:
+            raise ValueError("FEN must have one General of each color: %r" % (fen,))
+
+        game = cls.__new__(cls)
+        game._set_position(pieces, "black" if fields[1] == "b" else "red")
+        return game
+
+    def to_fen(self):
+        """
+        Returns the position as a xiangqi FEN string in the form read by from_fen, with 'w' for red to move.
+        Move counters are not kept by the game, so the string always ends with '- - 0 1'
+        """
+        ranks = []
+        board = self._board
+        for row in range(9, -1, -1):
+            rank = ""
+            empty = 0
+            for piece in board[row * 9:row * 9 + 9]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[piece._kind]
+                rank += letter.upper() if piece._color == "red" else letter
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        return "%s %s - - 0 1" % ("/".join(ranks), "w" if self._player_turn == "red" else "b")
+
     def is_in_check(self, player):
         """
         Takes as a parameter either 'red' or 'black' and
         returns True if that player is in check, but returns False otherwise
+        A player whose General faces the other General along an open file also counts as in check
         """
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-
-        # define board indices if player is red
-        player_general_row = int(self._red_general_location[1:]) - 1
-        player_general_column = file.index(self._red_general_location[0])
+        # define General location and other player
+        general_location = self._red_general_location
         other_player = "black"
-        if player == "red":
-            self._red_in_check = False
-
-        # define board indices if player is black
         if player == "black":
-            player_general_row = int(self._black_general_location[1:]) - 1
-            player_general_column = file.index(self._black_general_location[0])
+            general_location = self._black_general_location
             other_player = "red"
-            self._black_in_check = False
-
-        # see if player's General is in check by other player's Horse
-        if player_general_row - 2 >= 0 and player_general_column - 1 >= 0:
-            if (isinstance(self._the_board[player_general_row - 2][player_general_column - 1], Horse) and
-                    self._the_board[player_general_row - 2][player_general_column - 1].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_row - 2 >= 0 and player_general_column + 1 <= 8:
-            if (isinstance(self._the_board[player_general_row - 2][player_general_column + 1], Horse) and
-                    self._the_board[player_general_row - 2][player_general_column + 1].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_row - 1 >= 0 and player_general_column + 2 <= 8:
-            if (isinstance(self._the_board[player_general_row - 1][player_general_column + 2], Horse) and
-                    self._the_board[player_general_row - 1][player_general_column + 2].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_row + 1 <= 9 and player_general_column + 2 <= 8:
-            if (isinstance(self._the_board[player_general_row + 1][player_general_column + 2], Horse) and
-                    self._the_board[player_general_row + 1][player_general_column + 2].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_row + 2 <= 9 and player_general_column + 1 <= 8:
-            if (isinstance(self._the_board[player_general_row + 2][player_general_column + 1], Horse) and
-                    self._the_board[player_general_row + 2][player_general_column + 1].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_row + 2 <= 9 and player_general_column - 1 >= 0:
-            if (isinstance(self._the_board[player_general_row + 2][player_general_column - 1], Horse) and
-                    self._the_board[player_general_row + 2][player_general_column - 1].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_row + 1 <= 9 and player_general_column - 2 >= 0:
-            if (isinstance(self._the_board[player_general_row + 1][player_general_column - 2], Horse) and
-                    self._the_board[player_general_row + 1][player_general_column - 2].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_row - 1 >= 0 and player_general_column - 2 >= 0:
-            if (isinstance(self._the_board[player_general_row - 1][player_general_column - 2], Horse) and
-                    self._the_board[player_general_row - 1][player_general_column - 2].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        # see if player's General is in check by other player's Chariot
-        i = 1
-        while player_general_row + i <= 9:
-            if ((isinstance(self._the_board[player_general_row + i][player_general_column], Chariot) and
-                 self._the_board[player_general_row + i][player_general_column].get_color() == other_player)):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-            if self._the_board[player_general_row + i][player_general_column] == "":
-                i += 1
-            else:
-                break
-
-        i = 1
-        while player_general_row - i >= 0:
-            if ((isinstance(self._the_board[player_general_row - i][player_general_column], Chariot) and
-                 self._the_board[player_general_row - i][player_general_column].get_color() == other_player)):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-            if self._the_board[player_general_row - i][player_general_column] == "":
-                i += 1
-            else:
-                break
-
-        i = 1
-        while player_general_column + i <= 8:
-            if ((isinstance(self._the_board[player_general_row][player_general_column + i], Chariot) and
-                 self._the_board[player_general_row][player_general_column + i].get_color() == other_player)):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-            if self._the_board[player_general_row][player_general_column + i] == "":
-                i += 1
-            else:
-                break
-
-        i = 1
-        while player_general_column - i >= 0:
-            if ((isinstance(self._the_board[player_general_row][player_general_column - i], Chariot) and
-                 self._the_board[player_general_row][player_general_column - i].get_color() == other_player)):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-            if self._the_board[player_general_row][player_general_column - i] == "":
-                i += 1
-            else:
-                break
-
-        # see if player's General is in check by other player's Cannon
-        i = 1
-        count_i = 0
-        count_j = 0
-
-        while player_general_row + i <= 9:
-            if ((isinstance(self._the_board[player_general_row + i][player_general_column], Cannon) and
-                 self._the_board[player_general_row + i][player_general_column].get_color() == other_player)):
-                break
-            i += 1
-
-        if player_general_row + i < 9:
-            j = i + 1
-            while player_general_row + j <= 9:
-                if ((isinstance(self._the_board[player_general_row + j][player_general_column], Cannon) and
-                     self._the_board[player_general_row + j][player_general_column].get_color() == other_player)):
-                    break
-                j += 1
-
-            if (isinstance(self._the_board[player_general_row + j][player_general_column], Cannon) and
-                    self._the_board[player_general_row + j][player_general_column].get_color() == other_player):
-                j -= 1
-                while player_general_row + j > player_general_row:
-                    if self._the_board[player_general_row + j][player_general_column] != "":
-                        count_j += 1
-                    j -= 1
-
-        if (isinstance(self._the_board[player_general_row + i][player_general_column], Cannon) and
-                self._the_board[player_general_row + i][player_general_column].get_color() == other_player):
-            i -= 1
-            while player_general_row + i > player_general_row:
-                if self._the_board[player_general_row + i][player_general_column] != "":
-                    count_i += 1
-                i -= 1
-
-        if count_i == 1 or count_j == 1:
-            if player == "red":
-                self._red_in_check = True
-            if player == "black":
-                self._black_in_check = True
-
-        i = 1
-        count_i = 0
-        count_j = 0
-        while player_general_row - i >= 0:
-            if ((isinstance(self._the_board[player_general_row - i][player_general_column], Cannon) and
-                 self._the_board[player_general_row - i][player_general_column].get_color() == other_player)):
-                break
-            i += 1
-
-        if player_general_row - i > 0:
-            j = i + 1
-            while player_general_row - j >= 0:
-                if ((isinstance(self._the_board[player_general_row - j][player_general_column], Cannon) and
-                     self._the_board[player_general_row - j][player_general_column].get_color() == other_player)):
-                    break
-                j += 1
-
-            if (isinstance(self._the_board[player_general_row - j][player_general_column], Cannon) and
-                    self._the_board[player_general_row - j][player_general_column].get_color() == other_player):
-                j -= 1
-                while player_general_row - j < player_general_row:
-                    if self._the_board[player_general_row - j][player_general_column] != "":
-                        count_j += 1
-                    j -= 1
-
-        if (isinstance(self._the_board[player_general_row - i][player_general_column], Cannon) and
-                self._the_board[player_general_row - i][player_general_column].get_color() == other_player):
-            i -= 1
-            while player_general_row - i < player_general_row:
-                if self._the_board[player_general_row - i][player_general_column] != "":
-                    count_i += 1
-                i -= 1
-
-        if count_i == 1 or count_j == 1:
-            if player == "red":
-                self._red_in_check = True
-            if player == "black":
-                self._black_in_check = True
-
-        i = 1
-        count_i = 0
-        count_j = 0
-        while player_general_column + i <= 8:
-            if ((isinstance(self._the_board[player_general_row][player_general_column + i], Cannon) and
-                 self._the_board[player_general_row][player_general_column + i].get_color() == other_player)):
-                break
-            i += 1
-
-        if player_general_column + i < 8:
-            j = i + 1
-            while player_general_column + j <= 8:
-                if ((isinstance(self._the_board[player_general_row][player_general_column + j], Cannon) and
-                     self._the_board[player_general_row][player_general_column + j].get_color() == other_player)):
-                    break
-                j += 1
-
-            if (isinstance(self._the_board[player_general_row][player_general_column + j], Cannon) and
-                    self._the_board[player_general_row][player_general_column + j].get_color() == other_player):
-                j -= 1
-                while player_general_column + j > player_general_column:
-                    if self._the_board[player_general_row][player_general_column + j] != "":
-                        count_j += 1
-                    j -= 1
-
-        if (isinstance(self._the_board[player_general_row][player_general_column + i], Cannon) and
-                self._the_board[player_general_row][player_general_column + i].get_color() == other_player):
-            i -= 1
-            while player_general_column + i > player_general_column:
-                if self._the_board[player_general_row][player_general_column + i] != "":
-                    count_i += 1
-                i -= 1
-
-        if count_i == 1 or count_j == 1:
-            if player == "red":
-                self._red_in_check = True
-            if player == "black":
-                self._black_in_check = True
-
-        i = 1
-        count_i = 0
-        count_j = 0
-        while player_general_column - i >= 0:
-            if ((isinstance(self._the_board[player_general_row][player_general_column - i], Cannon) and
-                 self._the_board[player_general_row][player_general_column - i].get_color() == other_player)):
-                break
-            i += 1
-
-        if player_general_column - i > 0:
-            j = i + 1
-            while player_general_column - j >= 0:
-                if ((isinstance(self._the_board[player_general_row][player_general_column - j], Cannon) and
-                     self._the_board[player_general_row][player_general_column - j].get_color() == other_player)):
-                    break
-                j += 1
-
-            if (isinstance(self._the_board[player_general_row][player_general_column - j], Cannon) and
-                    self._the_board[player_general_row][player_general_column - j].get_color() == other_player):
-                j -= 1
-                while player_general_column - j < player_general_column:
-                    if self._the_board[player_general_row][player_general_column - j] != "":
-                        count_j += 1
-                    j -= 1
-
-        if (isinstance(self._the_board[player_general_row][player_general_column - i], Cannon) and
-                self._the_board[player_general_row][player_general_column - i].get_color() == other_player):
-            i -= 1
-            while player_general_column - i < player_general_column:
-                if self._the_board[player_general_row][player_general_column - i] != "":
-                    count_i += 1
-                i -= 1
-
-        if count_i == 1 or count_j == 1:
-            if player == "red":
-                self._red_in_check = True
-            if player == "black":
-                self._black_in_check = True
-
-        # see if player's General is in check by other player's Soldier
-        if player_general_row - 1 >= 0 and player == "black":
-            if (isinstance(self._the_board[player_general_row - 1][player_general_column], Soldier) and
-                    self._the_board[player_general_row - 1][player_general_column].get_color() == other_player):
-                self._black_in_check = True
-
-        if player_general_row + 1 <= 9 and player == "red":
-            if (isinstance(self._the_board[player_general_row + 1][player_general_column], Soldier) and
-                    self._the_board[player_general_row + 1][player_general_column].get_color() == other_player):
-                self._red_in_check = True
-
-        if player_general_column - 1 >= 0:
-            if (isinstance(self._the_board[player_general_row][player_general_column - 1], Soldier) and
-                    self._the_board[player_general_row][player_general_column - 1].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
-
-        if player_general_column + 1 <= 8:
-            if (isinstance(self._the_board[player_general_row][player_general_column + 1], Soldier) and
-                    self._the_board[player_general_row][player_general_column + 1].get_color() == other_player):
-                if player == "red":
-                    self._red_in_check = True
-                if player == "black":
-                    self._black_in_check = True
+
+        in_check = (self._position.is_attacked(general_location, other_player) or
+                    self._position.generals_facing())
 
         if player == "red":
+            self._red_in_check = in_check
             return self._red_in_check
 
         if player == "black":
+            self._black_in_check = in_check
             return self._black_in_check
 
     def make_move(self, from_square, to_square):
@@ -424,510 +412,447 @@ class XiangqiGame:
         If the general's player can make no move to prevent the general's capture, the situation is called "checkmate"
         and the other player wins. If a player has no legal/valid moves, the other player wins by stalemate.
         """
+        # move cannot be made if either square is not on the board
+        if from_square not in SQUARE_INDEX or to_square not in SQUARE_INDEX:
+            return False
+
         # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
+        from_index = SQUARE_INDEX[from_square]
+        to_index = SQUARE_INDEX[to_square]
+        piece = self._board[from_index]
 
         # move cannot be made if no piece exists at from_square
-        if self._the_board[from_row][from_column] == "":
+        if piece is None:
             return False
 
         # move cannot be made if player's piece exists at to_square
-        if self._the_board[to_row][to_column] != "":
-            if self._the_board[to_row][to_column].get_color() == self._player_turn:
+        if self._board[to_index] is not None:
+            if self._board[to_index].get_color() == self._player_turn:
                 return False
 
         # move cannot be made if: not player's turn, move is not legally available for piece based on class definition,
         # or game state is finished; either "RED_WON" or "BLACK_WON"
-        if self._the_board[from_row][from_column].get_color() != self._player_turn or \
-                self._the_board[from_row][from_column].is_legal_move(from_square, to_square) is False or \
-                self._game_state != "UNFINISHED":
+        if piece.get_color() != self._player_turn or \
+                piece._is_legal_move(from_index, to_index) is False or \
+                self.get_game_state() != "UNFINISHED":
             return False
 
-        # move cannot be made if it is not valid in relation to other pieces on the board:
-        # if piece trying to move is a General
-        if isinstance(self._the_board[from_row][from_column], General):
-            if self.is_valid_move_general(from_square, to_square) is False:
+        # if the legal moves of the position are already cached, the move must be one of them
+        if self._legal_moves is not None:
+            if to_index not in self._legal_moves.get(from_index, ()):
                 return False
+            self._push(from_index, to_index)
+            return True
 
-            # if red or black General moved, update location
-            if self._the_board[from_row][from_column].get_color() == "red":
-                self._red_general_location = to_square
-            if self._the_board[from_row][from_column].get_color() == "black":
-                self._black_general_location = to_square
+        # move cannot be made if it is not valid in relation to other pieces on the board
+        if self._is_valid_move(from_index, to_index) is False:
+            return False
 
-        # if piece trying to move is an Elephant
-        if isinstance(self._the_board[from_row][from_column], Elephant):
-            if self.is_valid_move_elephant(from_square, to_square) is False:
-                return False
+        # otherwise, make move and remove any captured piece; this also updates _player_turn
+        player = self._player_turn
+        self._push(from_index, to_index)
 
-        # if piece trying to move is a Horse
-        if isinstance(self._the_board[from_row][from_column], Horse):
-            if self.is_valid_move_horse(from_square, to_square) is False:
-                return False
+        # if player is in check, undo move and return False
+        # since player cannot put its own General in check
+        if self.is_in_check(player):
+            self._pop()
+            return False
 
-        # if piece trying to move is a Chariot
-        if isinstance(self._the_board[from_row][from_column], Chariot):
-            if self.is_valid_move_chariot(from_square, to_square) is False:
-                return False
+        # checkmate and stalemate of the player now to move are left to get_game_state
+        return True
 
-        # if piece trying to move is a Cannon
-        if isinstance(self._the_board[from_row][from_column], Cannon):
-            if self.is_valid_move_cannon(from_square, to_square) is False:
-                return False
+    def push(self, move):
+        """
+        Takes a move as a (from_square, to_square) tuple, for example ('b3', 'b10'), and makes it without
+        checking whether it is legal, then updates whose turn it is. The game state of the new position is left
+        to get_game_state.
+        Records the captured piece, the General locations, the turn, the cached game state, the position hash
+        and the score on the undo stack so that pop can undo it; the cached legal moves are kept for the last
+        move only.
+        Returns False if either square is not on the board, the squares are the same or no piece exists at
+        from_square, and True otherwise
+        """
+        from_square, to_square = move
+        if from_square not in SQUARE_INDEX or to_square not in SQUARE_INDEX or from_square == to_square or \
+                self._board[SQUARE_INDEX[from_square]] is None:
+            return False
+        self._push(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
+        return True
 
-        # otherwise, make move and remove any captured piece
-        temp = self._the_board[to_row][to_column]
-        self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-        self._the_board[from_row][from_column] = ""
+    def pop(self):
+        """
+        Undoes the last move made by push or make_move in O(1) without copying the board.
+        Returns the undone move as a (from_square, to_square) tuple, or None if there is no move to undo
+        """
+        if not self._undo_stack:
+            return None
+        from_index, to_index = self._pop()
+        return SQUARE_NAMES[from_index], SQUARE_NAMES[to_index]
 
-        # if it is player's turn and player is in check, undo move and return False
-        # since player cannot put its own General in check
-        if self.is_in_check(self._player_turn):
-            self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-            self._the_board[to_row][to_column] = temp
-
-            # if red or black General move is being undone, revert location
-            if self._the_board[from_row][from_column].get_color() == "red":
-                self._red_general_location = from_square
-            if self._the_board[from_row][from_column].get_color() == "black":
-                self._black_general_location = from_square
-            return False
+    def replay(self, moves, validate="full"):
+        """
+        Takes a list of moves as (from_square, to_square) tuples, for example [('h3', 'e3'), ('h10', 'g8')],
+        and makes them in order, stopping at the first move that cannot be made.
+        validate sets how much each move is checked:
+        'full' makes each move with make_move, checking for checkmate and stalemate before every move;
+        'light' checks that each move is legal but does not look for checkmate and stalemate, since a player with
+        no legal move cannot make one anyway, leaving them to get_game_state after the last move;
+        'none' makes each move with push, trusting that it is legal.
+        Under the repetition rules both still stop at a move made after a third occurrence of a position has
+        ended the game.
+        Returns None if every move was made, or else the index in moves of the first move that could not be made,
+        with the moves before it left on the board
+        """
+        if validate == "full":
+            for ply, (from_square, to_square) in enumerate(moves):
+                if not self.make_move(from_square, to_square):
+                    return ply
+            return None
+        if validate == "none":
+            for ply, move in enumerate(moves):
+                if self._ended_by_repetition() or not self.push(move):
+                    return ply
+            return None
+        if validate != "light":
+            raise ValueError("validate must be 'full', 'light' or 'none', not %r" % (validate,))
+
+        board = self._board
+        for ply, (from_square, to_square) in enumerate(moves):
+            from_index = SQUARE_INDEX.get(from_square)
+            to_index = SQUARE_INDEX.get(to_square)
+            if from_index is None or to_index is None or self._ended_by_repetition():
+                return ply
+            piece = board[from_index]
+            player = self._player_turn
+            if piece is None or piece._color != player or \
+                    (board[to_index] is not None and board[to_index]._color == player) or \
+                    piece._is_legal_move(from_index, to_index) is False or \
+                    self._is_valid_move(from_index, to_index) is False:
+                return ply
+
+            # only a move from or onto a line to player's General can leave it in check
+            check_squares = self._check_squares(player)
+            self._push(from_index, to_index)
+            if (check_squares >> from_index & 1 or check_squares >> to_index & 1) and self.is_in_check(player):
+                self._pop()
+                return ply
+        return None
+
+    def _ended_by_repetition(self):
+        """
+        Returns True if the repetition rules are on and the current position, reached for the third time or more,
+        has ended the game, and False otherwise; only a repeated position is checked
+        """
+        return self._repetition_rules and self._repetitions[self._hash] >= 3 and \
+            self.get_game_state() != "UNFINISHED"
 
-        # if red General is in checkmate or red player is in stalemate, update _game_state to "BLACK_WON"
-        from_spaces = ["a1", "b1", "c1", "d1", "e1", "f1", "g1", "h1", "i1",
-                       "a2", "b2", "c2", "d2", "e2", "f2", "g2", "h2", "i2",
-                       "a3", "b3", "c3", "d3", "e3", "f3", "g3", "h3", "i3",
-                       "a4", "b4", "c4", "d4", "e4", "f4", "g4", "h4", "i4",
-                       "a5", "b5", "c5", "d5", "e5", "f5", "g5", "h5", "i5",
-                       "a6", "b6", "c6", "d6", "e6", "f6", "g6", "h6", "i6",
-                       "a7", "b7", "c7", "d7", "e7", "f7", "g7", "h7", "i7",
-                       "a8", "b8", "c8", "d8", "e8", "f8", "g8", "h8", "i8",
-                       "a9", "b9", "c9", "d9", "e9", "f9", "g9", "h9", "i9",
-                       "a10", "b10", "c10", "d10", "e10", "f10", "g10", "h10", "i10"]
-        to_spaces = from_spaces
-        count = 0
-
-        for i in from_spaces:
-            if count > 0:
-                break
-
-            for j in to_spaces:
-                # define board indices
-                file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-                from_row = int(i[1:]) - 1
-                from_column = file.index(i[0])
-                to_row = int(j[1:]) - 1
-                to_column = file.index(j[0])
-
-                # piece must exist at from_square
-                if self._the_board[from_row][from_column] != "":
-
-                    # player's piece cannot exist at to_square
-                    if ((self._the_board[to_row][to_column] == "") or
-                            (self._the_board[to_row][to_column] != "" and
-                             self._the_board[to_row][to_column].get_color() != "red")):
-
-                        # must be player's piece at from_square, move must be legal
-                        if self._the_board[from_row][from_column].get_color() == "red" and \
-                                self._the_board[from_row][from_column].is_legal_move(i, j):
-
-                            # if piece considered is a General
-                            if (isinstance(self._the_board[from_row][from_column], General) and
-                                    self._the_board[from_row][from_column].get_color() == "red" and
-                                    self.is_valid_move_general(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check; update General location
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-                                self._red_general_location = j
-
-                                # if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("red") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                                # if General move is being undone, revert location
-                                self._red_general_location = i
-
-                            # if piece considered is an Advisor
-                            if (isinstance(self._the_board[from_row][from_column], Advisor) and
-                                    self._the_board[from_row][from_column].get_color() == "red"):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("red") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is an Elephant
-                            if (isinstance(self._the_board[from_row][from_column], Elephant) and
-                                    self._the_board[from_row][from_column].get_color() == "red" and
-                                    self.is_valid_move_elephant(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("red") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Horse
-                            if (isinstance(self._the_board[from_row][from_column], Horse) and
-                                    self._the_board[from_row][from_column].get_color() == "red" and
-                                    self.is_valid_move_horse(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("red") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Chariot
-                            if (isinstance(self._the_board[from_row][from_column], Chariot) and
-                                    self._the_board[from_row][from_column].get_color() == "red" and
-                                    self.is_valid_move_chariot(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("red") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Cannon
-                            if (isinstance(self._the_board[from_row][from_column], Cannon) and
-                                    self._the_board[from_row][from_column].get_color() == "red" and
-                                    self.is_valid_move_cannon(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("red") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Soldier
-                            if (isinstance(self._the_board[from_row][from_column], Soldier) and
-                                    self._the_board[from_row][from_column].get_color() == "red"):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("red") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-        # if red has no legal moves, black wins
-        if count == 0:
-            self._game_state = "BLACK_WON"
-
-        # if black General is in checkmate or black player is in stalemate, update _game_state to "RED_WON"
-        count = 0
-
-        for i in from_spaces:
-            if count > 0:
-                break
-
-            for j in to_spaces:
-                # define board indices
-                file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-                from_row = int(i[1:]) - 1
-                from_column = file.index(i[0])
-                to_row = int(j[1:]) - 1
-                to_column = file.index(j[0])
-
-                # piece must exist at from_square
-                if self._the_board[from_row][from_column] != "":
-
-                    # player's piece cannot exist at to_square
-                    if ((self._the_board[to_row][to_column] == "") or
-                            (self._the_board[to_row][to_column] != "" and
-                             self._the_board[to_row][to_column].get_color() != "black")):
-
-                        # must be player's piece at from_square, move must be legal
-                        if self._the_board[from_row][from_column].get_color() == "black" and \
-                                self._the_board[from_row][from_column].is_legal_move(i, j):
-
-                            # if piece considered is a General
-                            if (isinstance(self._the_board[from_row][from_column], General) and
-                                    self._the_board[from_row][from_column].get_color() == "black" and
-                                    self.is_valid_move_general(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check; update General location
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-                                self._black_general_location = j
-
-                                # if if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("black") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                                # if General move is being undone, revert location
-                                self._black_general_location = i
-
-                            # if piece considered is an Advisor
-                            if (isinstance(self._the_board[from_row][from_column], Advisor) and
-                                    self._the_board[from_row][from_column].get_color() == "black"):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("black") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is an Elephant
-                            if (isinstance(self._the_board[from_row][from_column], Elephant) and
-                                    self._the_board[from_row][from_column].get_color() == "black" and
-                                    self.is_valid_move_elephant(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("black") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Horse
-                            if (isinstance(self._the_board[from_row][from_column], Horse) and
-                                    self._the_board[from_row][from_column].get_color() == "black" and
-                                    self.is_valid_move_horse(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("black") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Chariot
-                            if (isinstance(self._the_board[from_row][from_column], Chariot) and
-                                    self._the_board[from_row][from_column].get_color() == "black" and
-                                    self.is_valid_move_chariot(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("black") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Cannon
-                            if (isinstance(self._the_board[from_row][from_column], Cannon) and
-                                    self._the_board[from_row][from_column].get_color() == "black" and
-                                    self.is_valid_move_cannon(i, j) is True):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("black") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-                            # if piece considered is a Soldier
-                            if (isinstance(self._the_board[from_row][from_column], Soldier) and
-                                    self._the_board[from_row][from_column].get_color() == "black"):
-
-                                # make move temporarily to see if it puts player in check
-                                temp = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = self._the_board[from_row][from_column]
-                                self._the_board[from_row][from_column] = ""
-
-                                # if if there is a legal/valid move here, add one to counter
-                                if self.is_in_check("black") is False:
-                                    count += 1
-
-                                # Undo move
-                                self._the_board[from_row][from_column] = self._the_board[to_row][to_column]
-                                self._the_board[to_row][to_column] = temp
-
-        # if black has no legal moves, red wins
-        if count == 0:
-            self._game_state = "RED_WON"
+    def _push(self, from_index, to_index):
+        """
+        Moves the piece at from_index to to_index on the board and bitboards, updates the General location
+        and _player_turn, and records what _pop needs on the undo stack
+        """
+        board = self._board
+        piece = board[from_index]
+        captured = board[to_index]
+        color = piece._color
+
+        self._undo_stack.append((from_index, to_index, captured, self._red_general_location,
+                                 self._black_general_location, self._player_turn, self._game_state,
+                                 self._hash, self._score))
+
+        # update the bitboards, the Zobrist hash, including the side-to-move key, and the score
+        keys = ZOBRIST_PIECES[color][piece._kind]
+        position_hash = self._hash ^ keys[from_index] ^ keys[to_index] ^ ZOBRIST_BLACK_TO_MOVE
+        scores = SQUARE_SCORES[color][piece._kind]
+        score = self._score + scores[to_index] - scores[from_index]
+        if captured is not None:
+            self._position.remove_piece(captured._color, captured._kind, to_index)
+            position_hash ^= ZOBRIST_PIECES[captured._color][captured._kind][to_index]
+            score -= SQUARE_SCORES[captured._color][captured._kind][to_index]
+        self._position.move_piece(color, piece._kind, from_index, to_index)
+        self._hash = position_hash
+        self._score = score
+        self._repetitions[position_hash] = self._repetitions.get(position_hash, 0) + 1
+        board[to_index] = piece
+        board[from_index] = None
+
+        # if red or black General moved, update location
+        if piece._kind == GENERAL:
+            if color == "red":
+                self._red_general_location = to_index
+            else:
+                self._black_general_location = to_index
+
+        # the game state and legal moves of the new position are computed on demand
+        self._game_state = None
+        if self._legal_moves is not None:
+            self._previous_legal_moves = (len(self._undo_stack) - 1, self._legal_moves)
+        self._legal_moves = None
 
         # update _player_turn
         if self._player_turn == "red":
             self._player_turn = "black"
-            return True
-
-        # update _player_turn
-        if self._player_turn == "black":
+        else:
             self._player_turn = "red"
-            return True
 
-    def is_valid_move_general(self, from_square, to_square):
+    def _pop(self):
+        """
+        Undoes the last _push and returns its (from_index, to_index)
+        """
+        (from_index, to_index, captured, red_general_location, black_general_location, player_turn, game_state,
+         position_hash, score) = self._undo_stack.pop()
+        board = self._board
+        piece = board[to_index]
+
+        count = self._repetitions[self._hash] - 1
+        if count:
+            self._repetitions[self._hash] = count
+        else:
+            del self._repetitions[self._hash]
+
+        self._position.move_piece(piece._color, piece._kind, to_index, from_index)
+        board[from_index] = piece
+        board[to_index] = captured
+        if captured is not None:
+            self._position.add_piece(captured._color, captured._kind, to_index)
+
+        self._red_general_location = red_general_location
+        self._black_general_location = black_general_location
+        self._player_turn = player_turn
+        self._game_state = game_state
+        self._legal_moves = None
+        if self._previous_legal_moves is not None and self._previous_legal_moves[0] == len(self._undo_stack):
+            self._legal_moves = self._previous_legal_moves[1]
+            self._previous_legal_moves = None
+        self._hash = position_hash
+        self._score = score
+        return from_index, to_index
+
+    def _generate_moves(self, color):
+        """
+        Yields (from_index, to_index) pairs for the pseudo-legal moves of color's pieces, read from the
+        bitboard attack tables: destinations holding color's own pieces are skipped, check is left to the caller
+        """
+        position = self._position
+
+        for kind in (CHARIOT, CANNON, HORSE, SOLDIER, ELEPHANT, ADVISOR, GENERAL):
+            pieces = position.get_pieces(color, kind)
+            while pieces:
+                from_bit = pieces & -pieces
+                pieces ^= from_bit
+                from_index = from_bit.bit_length() - 1
+
+                destinations = position.get_moves(color, kind, from_index)
+                while destinations:
+                    to_bit = destinations & -destinations
+                    destinations ^= to_bit
+                    yield from_index, to_bit.bit_length() - 1
+
+    def _is_valid_move(self, from_index, to_index):
         """
         Returns True if valid move and False if invalid move
-        Considers move within the context of current board
+        Dispatches to the is_valid_move method for the kind of piece at from_index
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        # return False when Generals cannot face each other along the same file with no intervening pieces
-        if self._the_board[from_row][from_column].get_color() == "red":
-            if isinstance(self._the_board[9][to_column], General):
-                rank = 9
-                while to_row < rank:
-                    if self._the_board[rank - 1][to_column] != "":
-                        return True
-                    rank -= 1
-                return False
-
-            if isinstance(self._the_board[8][to_column], General):
-                rank = 8
-                while to_row < rank:
-                    if self._the_board[rank - 1][to_column] != "":
-                        return True
-                    rank -= 1
-                return False
+        kind = self._board[from_index]._kind
+
+        if kind == GENERAL:
+            return self._is_valid_move_general(from_index, to_index)
+        if kind == ELEPHANT:
+            return self._is_valid_move_elephant(from_index, to_index)
+        if kind == HORSE:
+            return self._is_valid_move_horse(from_index, to_index)
+        if kind == CHARIOT:
+            return self._is_valid_move_chariot(from_index, to_index)
+        if kind == CANNON:
+            return self._is_valid_move_cannon(from_index, to_index)
+        return True
 
-            if isinstance(self._the_board[7][to_column], General):
-                rank = 7
-                while to_row < rank:
-                    if self._the_board[rank - 1][to_column] != "":
-                        return True
-                    rank -= 1
-                return False
+    def _has_legal_move(self, color):
+        """
+        Returns True if color has at least one legal/valid move that does not leave its General in check,
+        and False if color is in checkmate or stalemate
+        """
+        for move in self._iterate_legal_moves(color):
             return True
+        return False
 
-        if self._the_board[from_row][from_column].get_color() == "black":
-            if isinstance(self._the_board[0][to_column], General):
-                rank = 0
-                while to_row > rank:
-                    if self._the_board[rank + 1][to_column] != "":
-                        return True
-                    rank += 1
-                return False
+    def _generate_legal_moves(self, color):
+        """
+        Returns a list of (from_index, to_index) pairs for color's moves that do not leave its General in check
+        """
+        return list(self._iterate_legal_moves(color))
 
-            if isinstance(self._the_board[1][to_column], General):
-                rank = 1
-                while to_row > rank:
-                    if self._the_board[rank + 1][to_column] != "":
-                        return True
-                    rank += 1
-                return False
+    def _repetition_result(self):
+        """
+        Returns the game state of a position reached for the third time: the moves since its last occurrence are
+        made again from the undo stack to see which of them gave check and which chased a piece, and a player who
+        checked with every move loses, or else a player who chased with every move, unless the other player did
+        the same, in which case, as when neither did, the game is drawn
+        """
+        cycle = 0
+        while self._undo_stack[-1 - cycle][7] != self._hash:
+            cycle += 1
+        moves = [self._pop() for ply in range(cycle + 1)]
+
+        # 2 for a player whose every move gave check, 1 for one whose every move chased and 0 otherwise
+        offences = {"red": 2, "black": 2}
+        for from_index, to_index in reversed(moves):
+            player = self._player_turn
+            other_player = "black" if player == "red" else "red"
+            kind = self._board[from_index]._kind
+            attacked = self._position.get_moves(player, kind, from_index) & self._position.get_occupied(other_player)
+            self._push(from_index, to_index)
+            if self.is_in_check(other_player):
+                offence = 2
+            else:
+                offence = 1 if self._chases(to_index, attacked) else 0
+            offences[player] = min(offences[player], offence)
 
-            if isinstance(self._the_board[2][to_column], General):
-                rank = 2
-                while to_row > rank:
-                    if self._the_board[rank + 1][to_column] != "":
-                        return True
-                    rank += 1
-                return False
-            return True
+        if offences["red"] == offences["black"]:
+            return "DRAW"
+        return "BLACK_WON" if offences["red"] > offences["black"] else "RED_WON"
 
-    def is_valid_move_elephant(self, from_square, to_square):
+    def _chases(self, square, attacked):
+        """
+        Returns True if the piece just moved to square attacks a piece of the other player that it did not attack
+        from where it came, given as the bitboard attacked, and that piece is a Chariot attacked by a Horse or
+        Cannon, or is not protected. Generals and Soldiers never chase, and Soldiers that have not crossed the
+        river and Generals cannot be chased
+        """
+        piece = self._board[square]
+        kind = piece._kind
+        if kind == GENERAL or kind == SOLDIER:
+            return False
+        player = piece._color
+        other_player = "black" if player == "red" else "red"
+        targets = self._position.get_moves(player, kind, square) & self._position.get_occupied(other_player) & \
+            ~attacked
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            target = bit.bit_length() - 1
+            target_kind = self._board[target]._kind
+            if target_kind == GENERAL or \
+                    (target_kind == SOLDIER and (_ROW[target] <= 4) == (other_player == "red")):
+                continue
+            if (target_kind == CHARIOT and kind in (HORSE, CANNON)) or \
+                    not self._position.is_attacked(target, other_player):
+                return True
+        return False
+
+    def _check_squares(self, color):
+        """
+        Returns the bitboard of squares that a move by color must leave or enter to possibly leave its General
+        in check, or -1 (every square) if color is already in check.
+        A move changes the occupancy of its from and to squares only, and only pieces on the General's rank or
+        file (Chariots, Cannons and their screens, and the other General) or next to it diagonally (the legs of
+        Horses attacking it) decide whether it is attacked, so any other move by a piece other than the General
+        keeps it safe. The General's own square is on its rank, so its moves are always included
+        """
+        if self.is_in_check(color):
+            return -1
+        general_location = self._red_general_location if color == "red" else self._black_general_location
+        return LINES[general_location] | DIAGONAL_NEIGHBOURS[general_location]
+
+    def _iterate_legal_moves(self, color):
+        """
+        Yields the (from_index, to_index) pairs for color's moves that do not leave its General in check.
+        The checkers and pins of color's General are computed once, so a move is only tried on the board if
+        it is a General move, a pinned piece moving along its line, or a candidate to end a check
+        """
+        general_location = self._red_general_location if color == "red" else self._black_general_location
+        checkers, evasions, pins, screens = self._position.get_checks_and_pins(color)
+
+        for from_index, to_index in self._generate_moves(color):
+            if from_index != general_location:
+                if checkers:
+                    # a move that neither captures nor blocks the checker nor moves its screen cannot end the check
+                    if not (evasions >> from_index & 1 or evasions >> to_index & 1):
+                        continue
+                else:
+                    pin = pins.get(from_index)
+                    if pin is None:
+                        # no other move can attack the General, except by giving a Cannon a screen
+                        if not screens >> to_index & 1:
+                            yield from_index, to_index
+                        continue
+                    if not pin >> to_index & 1:
+                        continue
+
+            # make move temporarily to see if it puts player in check
+            self._push(from_index, to_index)
+            in_check = self.is_in_check(color)
+            self._pop()
+
+            if in_check is False:
+                yield from_index, to_index
+
+    def perft(self, depth, divide=False):
+        """
+        Returns the number of positions reached by playing out every sequence of depth legal moves from the
+        current position, without updating the game state. With divide=True, returns a dict mapping each legal
+        (from_square, to_square) move to the number of positions counted below it instead
+        """
+        if divide:
+            counts = {}
+            for from_index, to_index in self._generate_legal_moves(self._player_turn):
+                self._push(from_index, to_index)
+                counts[(SQUARE_NAMES[from_index], SQUARE_NAMES[to_index])] = self._perft(depth - 1)
+                self._pop()
+            return counts
+        return self._perft(depth)
+
+    def _perft(self, depth):
+        """
+        Returns the perft count of the current position at depth, counting the last ply in bulk
+        """
+        if depth <= 0:
+            return 1
+        legal_moves = self._generate_legal_moves(self._player_turn)
+        if depth == 1:
+            return len(legal_moves)
+
+        nodes = 0
+        for from_index, to_index in legal_moves:
+            self._push(from_index, to_index)
+            nodes += self._perft(depth - 1)
+            self._pop()
+        return nodes
+
+    def is_valid_move_general(self, from_square, to_square):
         """
         Returns True if valid move and False if invalid move
         Considers move within the context of current board
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
+        return self._is_valid_move_general(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
-        # Elephants cannot jump so return False if there is a piece blocking its first diagonal move
-        if to_row == from_row + 2 and to_column == from_column + 2:
-            if self._the_board[from_row + 1][from_column + 1] != "":
-                return False
+    def _is_valid_move_general(self, from_index, to_index):
+        """
+        Returns True if valid move and False if invalid move between square indexes from_index and to_index
+        """
+        # return False when the General would face the other General along the same file with no intervening pieces
+        return not self._position.faces_general(self._board[from_index]._color, to_index, from_index)
 
-        if to_row == from_row - 2 and to_column == from_column - 2:
-            if self._the_board[from_row - 1][from_column - 1] != "":
-                return False
+    def is_valid_move_elephant(self, from_square, to_square):
+        """
+        Returns True if valid move and False if invalid move
+        Considers move within the context of current board
+        """
+        return self._is_valid_move_elephant(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
-        if to_row == from_row + 2 and to_column == from_column - 2:
-            if self._the_board[from_row + 1][from_column - 1] != "":
-                return False
+    def _is_valid_move_elephant(self, from_index, to_index):
+        """
+        Returns True if valid move and False if invalid move between square indexes from_index and to_index
+        """
+        # define board indices
+        from_row = _ROW[from_index]
+        from_column = _COLUMN[from_index]
+        to_row = _ROW[to_index]
+        to_column = _COLUMN[to_index]
 
-        if to_row == from_row - 2 and to_column == from_column + 2:
-            if self._the_board[from_row - 1][from_column + 1] != "":
+        # Elephants cannot jump so return False if there is a piece blocking its first diagonal move
+        if abs(to_row - from_row) == 2 and abs(to_column - from_column) == 2:
+            if self._board[(from_index + to_index) // 2] is not None:
                 return False
         return True
 
@@ -936,32 +861,25 @@ class XiangqiGame:
         Returns True if valid move and False if invalid move
         Considers move within the context of current board
         """
+        return self._is_valid_move_horse(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
+
+    def _is_valid_move_horse(self, from_index, to_index):
+        """
+        Returns True if valid move and False if invalid move between square indexes from_index and to_index
+        """
         # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
+        from_row = _ROW[from_index]
+        from_column = _COLUMN[from_index]
+        row_step = _ROW[to_index] - from_row
+        column_step = _COLUMN[to_index] - from_column
 
         # Horses cannot jump so return False if there is a piece blocking its first orthogonal move
-        if ((to_row == from_row - 2 and to_column == from_column - 1) or
-                (to_row == from_row - 2 and to_column == from_column + 1)):
-            if self._the_board[from_row - 1][from_column] != "":
-                return False
-
-        if ((to_row == from_row - 1 and to_column == from_column + 2) or
-                (to_row == from_row + 1 and to_column == from_column + 2)):
-            if self._the_board[from_row][from_column + 1] != "":
+        if abs(row_step) == 2 and abs(column_step) == 1:
+            if self._board[from_index + 9 * (row_step // 2)] is not None:
                 return False
 
-        if ((to_row == from_row + 2 and to_column == from_column + 1) or
-                (to_row == from_row + 2 and to_column == from_column - 1)):
-            if self._the_board[from_row + 1][from_column] != "":
-                return False
-
-        if ((to_row == from_row + 1 and to_column == from_column - 2) or
-                (to_row == from_row - 1 and to_column == from_column - 2)):
-            if self._the_board[from_row][from_column - 1] != "":
+        if abs(row_step) == 1 and abs(column_step) == 2:
+            if self._board[from_index + column_step // 2] is not None:
                 return False
         return True
 
@@ -970,93 +888,50 @@ class XiangqiGame:
         Returns True if valid move and False if invalid move
         Considers move within the context of current board
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        # Chariots cannot jump so return False if there is a piece in its orthogonal path
-        i = 1
-        while from_row + i < to_row:
-            if from_column == to_column and self._the_board[from_row + i][from_column] != "":
-                return False
-            i += 1
+        return self._is_valid_move_chariot(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
-        i = 1
-        while from_row - i > to_row:
-            if from_column == to_column and self._the_board[from_row - i][from_column] != "":
-                return False
-            i += 1
-
-        i = 1
-        while from_column + i < to_column:
-            if from_row == to_row and self._the_board[from_row][from_column + i] != "":
-                return False
-            i += 1
-
-        i = 1
-        while from_column - i > to_column:
-            if from_row == to_row and self._the_board[from_row][from_column - i] != "":
-                return False
-            i += 1
-        return True
+    def _is_valid_move_chariot(self, from_index, to_index):
+        """
+        Returns True if valid move and False if invalid move between square indexes from_index and to_index
+        """
+        # Chariots cannot jump so return False if there is a piece in its orthogonal path; the squares a Chariot
+        # reaches are looked up from the occupancy of its rank and file
+        if from_index == to_index or not LINES[from_index] >> to_index & 1:
+            return True
+        return self._position.chariot_reaches(from_index, to_index)
 
     def is_valid_move_cannon(self, from_square, to_square):
         """
         Returns True if valid move and False if invalid move
         Only considers move within the context of current board
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
+        return self._is_valid_move_cannon(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
+    def _is_valid_move_cannon(self, from_index, to_index):
+        """
+        Returns True if valid move and False if invalid move between square indexes from_index and to_index
+        """
         # Cannons can move any distance orthogonally without jumping
         # if there is only ONE piece in the path between square_from and square_to, then
         # Cannons can capture and return True
-
-        i = 1
-        count = 0
-        while from_row + i < to_row:
-            if from_column == to_column and self._the_board[from_row + i][from_column] != "":
-                count += 1
-            i += 1
-
-        i = 1
-        while from_row - i > to_row:
-            if from_column == to_column and self._the_board[from_row - i][from_column] != "":
-                count += 1
-            i += 1
-
-        i = 1
-        while from_column + i < to_column:
-            if from_row == to_row and self._the_board[from_row][from_column + i] != "":
-                count += 1
-            i += 1
-
-        i = 1
-        while from_column - i > to_column:
-            if from_row == to_row and self._the_board[from_row][from_column - i] != "":
-                count += 1
-            i += 1
-
-        if (count > 1 or (count == 0 and self._the_board[to_row][to_column] != "") or
-                (count == 1 and self._the_board[to_row][to_column] == "")):
-            return False
-        return True
+        if self._board[to_index] is None:
+            return self._is_valid_move_chariot(from_index, to_index)
+        return LINES[from_index] >> to_index & 1 == 1 and self._position.cannon_reaches(from_index, to_index)
 
 
-class General:
+class Piece:
     """
-    Represents a General with data member _color
-    The general starts the game at the midpoint of the back edge, within the palace.
-    The general may move and capture one point orthogonally and may not leave the palace.
+    Represents a piece with data member _color, the base class of General, Advisor, Elephant, Horse, Chariot,
+    Cannon and Soldier. Pieces carry no state that changes during a game, so XiangqiGame shares one piece object
+    per piece kind and colour from PIECES between all of its squares and games. Subclasses set _kind, the
+    small integer piece kind used to index tables, and declare empty __slots__ so pieces have no __dict__
     """
 
+    __slots__ = ("_color",)
+
+    # piece kind used to index the bitboards
+    _kind = None
+
     def __init__(self, color):
         self._color = color
 
@@ -1066,31 +941,42 @@ class General:
         """
         return self._color
 
+    def get_kind(self):
+        """
+        Returns the piece kind, an integer from GENERAL (0) to SOLDIER (6)
+        """
+        return self._kind
+
+    def _is_legal_move(self, from_index, to_index):
+        """
+        Returns True if legal move and False if illegal move between square indexes from_index and to_index,
+        considering the squares themselves and the move style of the piece's kind and colour only.
+        The squares each piece may move to from each square are precomputed in GEOMETRY
+        """
+        return GEOMETRY[self._color][self._kind][from_index] >> to_index & 1 == 1
+
+
+class General(Piece):
+    """
+    Represents a General with data member _color
+    The general starts the game at the midpoint of the back edge, within the palace.
+    The general may move and capture one point orthogonally and may not leave the palace.
+    """
+
+    __slots__ = ()
+
+    # piece kind used to index the bitboards
+    _kind = GENERAL
+
     def is_legal_move(self, from_square, to_square):
         """
         Returns True if legal move and False if illegal move
         Considers spaces themselves and move style (one space orthogonally and cannot leave palace)
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        if (self._color == "red" and from_row < 3 and to_row < 3 and 6 > from_column > 2 and 6 > to_column > 2 and
-                ((from_row + 1 == to_row or from_row - 1 == to_row) and from_column == to_column) or
-                ((from_column + 1 == to_column or from_column - 1 == to_column) and from_row == to_row)):
-            return True
+        return self._is_legal_move(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
-        if (self._color == "black" and from_row > 6 and to_row < 6 and 6 > from_column > 2 and 6 > to_column > 2 and
-                ((from_row + 1 == to_row or from_row - 1 == to_row) and from_column == to_column) or
-                ((from_column + 1 == to_column or from_column - 1 == to_column) and from_row == to_row)):
-            return True
-        return False
 
-
-class Advisor:
+class Advisor(Piece):
     """
     Represents an Advisor with data member _color
     The advisors start on either side of the general. They move and capture one point diagonally and
@@ -1098,44 +984,20 @@ class Advisor:
     The advisor is like the queen in Western chess.
     """
 
-    def __init__(self, color):
-        self._color = color
+    __slots__ = ()
 
-    def get_color(self):
-        """
-        Returns piece color
-        """
-        return self._color
+    # piece kind used to index the bitboards
+    _kind = ADVISOR
 
     def is_legal_move(self, from_square, to_square):
         """
         Returns True if legal move and False if illegal move
         Considers spaces themselves and move style (one space diagonally and cannot leave palace)
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        if self._color == "red" and from_row < 3 and 6 > from_column > 2 and 6 > to_column > 2 and \
-                (((from_row + 1 == to_row) and (from_column + 1 == to_column)) or
-                 ((from_row - 1 == to_row) and (from_column - 1 == to_column)) or
-                 ((from_row + 1 == to_row) and (from_column - 1 == to_column)) or
-                 ((from_row - 1 == to_row) and (from_column + 1 == to_column))):
-            return True
-
-        if self._color == "black" and from_row > 6 and 6 > from_column > 2 and 6 > to_column > 2 and \
-                (((from_row + 1 == to_row) and (from_column + 1 == to_column)) or
-                 ((from_row - 1 == to_row) and (from_column - 1 == to_column)) or
-                 ((from_row + 1 == to_row) and (from_column - 1 == to_column)) or
-                 ((from_row - 1 == to_row) and (from_column + 1 == to_column))):
-            return True
-        return False
+        return self._is_legal_move(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
 
-class Elephant:
+class Elephant(Piece):
     """
     Represents an Elephant with data member _color
     These pieces move and capture exactly two points diagonally and may not jump over intervening pieces;
@@ -1144,55 +1006,20 @@ class Elephant:
     restricted to just seven board positions.
     """
 
-    def __init__(self, color):
-        self._color = color
+    __slots__ = ()
 
-    def get_color(self):
-        """
-        Returns piece color
-        """
-        return self._color
+    # piece kind used to index the bitboards
+    _kind = ELEPHANT
 
     def is_legal_move(self, from_square, to_square):
         """
         Returns True if legal move and False if illegal move
         Considers space themselves and move style (two spaces diagonally and cannot cross river)
         """
-        # list of files to associate index values
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
+        return self._is_legal_move(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
-        # define board indices
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        # Elephants cannot cross the river
-        if self._color == "red" and \
-                (((from_row == 0 and from_column == 2) or (from_row == 0 and from_column == 6) or
-                  (from_row == 2 and from_column == 0) or (from_row == 2 and from_column == 4) or
-                  (from_row == 2 and from_column == 8) or (from_row == 4 and from_column == 2) or
-                  (from_row == 4 and from_column == 6)) and
-                 ((to_row == from_row + 2 and to_column == from_column + 2) or
-                  (to_row == from_row - 2 and to_column == from_column - 2) or
-                  (to_row == from_row + 2 and to_column == from_column - 2) or
-                  (to_row == from_row - 2 and to_column == from_column + 2))):
-            return True
 
-        if self._color == "black" and \
-                (((from_row == 9 and from_column == 2) or (from_row == 9 and from_column == 6) or
-                  (from_row == 7 and from_column == 0) or (from_row == 7 and from_column == 4) or
-                  (from_row == 7 and from_column == 9) or (from_row == 5 and from_column == 2) or
-                  (from_row == 5 and from_column == 6)) and
-                 ((to_row == from_row + 2 and to_column == from_column + 2) or
-                  (to_row == from_row - 2 and to_column == from_column - 2) or
-                  (to_row == from_row + 2 and to_column == from_column - 2) or
-                  (to_row == from_row - 2 and to_column == from_column + 2))):
-            return True
-        return False
-
-
-class Horse:
+class Horse(Piece):
     """
     Represents a Horse with data member _color
     Horses begin the game next to the elephants, on their outside flanks.
@@ -1201,75 +1028,40 @@ class Horse:
     horizontally or vertically adjacent to it. Blocking a horse is called "hobbling the horse's leg".
     """
 
-    def __init__(self, color):
-        self._color = color
+    __slots__ = ()
 
-    def get_color(self):
-        """
-        Returns piece color
-        """
-        return self._color
+    # piece kind used to index the bitboards
+    _kind = HORSE
 
     def is_legal_move(self, from_square, to_square):
         """
         Returns True if legal move and False if illegal move
         Considers spaces themselves and move style (one space orthogonal and one space diagonal)
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        if ((self._color == "red" or self._color == "black") and
-                ((from_row - 2 == to_row and from_column - 1 == to_column) or
-                 (from_row - 2 == to_row and from_column + 1 == to_column) or
-                 (from_row - 1 == to_row and from_column + 2 == to_column) or
-                 (from_row + 1 == to_row and from_column + 2 == to_column) or
-                 (from_row + 2 == to_row and from_column + 1 == to_column) or
-                 (from_row + 2 == to_row and from_column - 1 == to_column) or
-                 (from_row + 1 == to_row and from_column - 2 == to_column) or
-                 (from_row - 1 == to_row and from_column - 2 == to_column))):
-            return True
-        return False
+        return self._is_legal_move(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
 
-class Chariot:
+class Chariot(Piece):
     """
     Represents a Chariot with data member _color
     The chariot moves and captures any distance orthogonally, but may not jump over intervening pieces.
     The chariots begin the game on the points at the corners of the board.
     """
 
-    def __init__(self, color):
-        self._color = color
+    __slots__ = ()
 
-    def get_color(self):
-        """
-        Returns piece color
-        """
-        return self._color
+    # piece kind used to index the bitboards
+    _kind = CHARIOT
 
     def is_legal_move(self, from_square, to_square):
         """
         Returns True if legal move and False if illegal move
         Considers space itself and move style (any distance orthogonal)
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        if ((self._color == "red" or self._color == "black") and
-                ((to_row == from_row) or (to_column == from_column))):
-            return True
-        return False
+        return self._is_legal_move(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
 
-class Cannon:
+class Cannon(Piece):
     """
     Represents a Cannon with data member _color.
     Each player has two cannons, which start on the row behind the soldiers, two points in front of the horses.
@@ -1280,34 +1072,20 @@ class Cannon:
     the piece to be captured.
     """
 
-    def __init__(self, color):
-        self._color = color
+    __slots__ = ()
 
-    def get_color(self):
-        """
-        Returns piece color
-        """
-        return self._color
+    # piece kind used to index the bitboards
+    _kind = CANNON
 
     def is_legal_move(self, from_square, to_square):
         """
         Returns True if legal move and False if illegal move
         Considers space itself and move style (any distance orthogonal)
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        if ((self._color == "red" or self._color == "black") and
-                ((to_row == from_row) or (to_column == from_column))):
-            return True
-        return False
+        return self._is_legal_move(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
 
-class Soldier:
+class Soldier(Piece):
     """
     Represents a Soldier with data member _color
     Each side starts with five soldiers. Soldiers begin the game located on every other point one row back
@@ -1315,14 +1093,10 @@ class Soldier:
     they may also move and capture one point horizontally. Soldiers cannot move backward.
     """
 
-    def __init__(self, color):
-        self._color = color
+    __slots__ = ()
 
-    def get_color(self):
-        """
-        Returns piece color
-        """
-        return self._color
+    # piece kind used to index the bitboards
+    _kind = SOLDIER
 
     def is_legal_move(self, from_square, to_square):
         """
@@ -1330,29 +1104,14 @@ class Soldier:
         Considers space itself and move style
         (one space forward until the river is crossed, then one space forward or horizontal)
         """
-        # define board indices
-        file = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
-        from_row = int(from_square[1:]) - 1
-        from_column = file.index(from_square[0])
-        to_row = int(to_square[1:]) - 1
-        to_column = file.index(to_square[0])
-
-        if self._color == "red":
-            if from_row + 1 == to_row and to_column == from_column:
-                return True
-            if from_row > 4:
-                if ((from_column + 1 == to_column and to_row == from_row) or
-                        (from_column - 1 == to_column and to_row == from_row)):
-                    return True
+        return self._is_legal_move(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square])
 
-        if self._color == "black":
-            if from_row - 1 == to_row and to_column == from_column:
-                return True
-            if from_row < 5:
-                if ((from_column + 1 == to_column and to_row == from_row) or
-                        (from_column - 1 == to_column and to_row == from_row)):
-                    return True
-        return False
+
+# piece classes indexed by piece kind
+PIECE_CLASSES = (General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier)
+
+# the shared piece objects placed on every board, indexed by color and piece kind
+PIECES = {color: tuple(piece_class(color) for piece_class in PIECE_CLASSES) for color in ("red", "black")}
 
 
 def main():
@@ -1,15 +1,58 @@
 # Author: Jillian Crowley
 # Date: 03/12/2020
-# Description:  Writes 16 unit tests for XiangqiGame.py.
+# Description:  Writes 40 unit tests for XiangqiGame.py.
 
+import asyncio
+import io
+import os
+import random
+import tempfile
 import unittest
-from XiangqiGame import XiangqiGame, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from XiangqiGame import XiangqiGame, STARTING_FEN, PIECES, SQUARE_INDEX, SQUARE_NAMES, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier
+from XiangqiSearch import XiangqiSearch, MATE_SCORE
+from XiangqiParallel import parallel_perft, parallel_search
+from XiangqiBitboard import GEOMETRY, ELEPHANT, ADVISOR
+from XiangqiRecords import GameRecordWriter, GameRecordReader
+from XiangqiBook import build_book, OpeningBook
+from XiangqiUCCI import UCCIEngine, from_ucci_move, to_ucci_move
+from XiangqiServer import XiangqiServer
+from XiangqiMCTS import XiangqiMCTS, run_playouts
+from XiangqiTablebase import generate_tablebase, Tablebase
+from XiangqiEvaluation import evaluate, evaluate_full
+
+# red's win of test_red_wins_1, ending in checkmate with g9 g10; several tests replay it or a part of it
+RED_WINS_MOVES = [('h3', 'e3'), ('h8', 'g8'), ('h1', 'i3'), ('i10', 'i9'), ('i1', 'h1'), ('h10', 'i8'), ('e3', 'e7'),
+                  ('i8', 'g9'), ('b3', 'e3'), ('g8', 'h8'), ('h1', 'h8'), ('b8', 'b6'), ('h8', 'e8'), ('f10', 'e9'),
+                  ('e8', 'i8'), ('c10', 'e8'), ('i8', 'i9'), ('b6', 'b2'), ('i9', 'g9'), ('c7', 'c6'), ('g9', 'g10')]
 
 
 class TestXiangqiGame(unittest.TestCase, XiangqiGame, General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier):
     """
     Contains unit tests for the functions in XiangqiGame
     """
+    def test_geometry(self):
+        def points(color, kind):
+            return [SQUARE_NAMES[index] for index in range(90) if GEOMETRY[color][kind][index]]
+
+        result_1 = (points("red", ELEPHANT), points("black", ELEPHANT))
+        result_2 = (points("red", ADVISOR), points("black", ADVISOR))
+        elephant = Elephant("black")
+        result_3 = (elephant.is_legal_move("c10", "a8"), elephant.is_legal_move("e8", "g6"),
+                    elephant.is_legal_move("g6", "i4"), elephant.is_legal_move("i8", "i10"))
+        advisor = Advisor("black")
+        result_4 = (advisor.is_legal_move("d10", "e9"), advisor.is_legal_move("e9", "f8"),
+                    advisor.is_legal_move("e10", "d9"))
+        soldier = Soldier("black")
+        result_5 = (soldier.is_legal_move("c7", "c6"), soldier.is_legal_move("c7", "d7"),
+                    soldier.is_legal_move("c5", "d5"), soldier.is_legal_move("c5", "c6"))
+        result_6 = (Chariot("red").is_legal_move("a1", "a1"), Horse("red").is_legal_move("b1", "c3"))
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6)
+        self.assertEqual(final_result, ((['c1', 'g1', 'a3', 'e3', 'i3', 'c5', 'g5'],
+                                         ['c6', 'g6', 'a8', 'e8', 'i8', 'c10', 'g10']),
+                                        (['d1', 'f1', 'e2', 'd3', 'f3'], ['d8', 'f8', 'e9', 'd10', 'f10']),
+                                        (True, True, False, False), (True, True, False), (True, False, True, False),
+                                        (False, True)))
+
     def test_general_is_legal_move(self):
         general = General("red")
         color = general.get_color()
@@ -94,6 +137,19 @@ class TestXiangqiGame(unittest.TestCase, XiangqiGame, General, Advisor, Elephant
         final_result = (color, result_1, result_2, result_3, result_4, result_5, result_6)
         self.assertEqual(final_result, ("red", True, True, True, False, False, False))
 
+    def test_black_pieces_is_legal_move(self):
+        general = General("black")
+        advisor = Advisor("black")
+        elephant = Elephant("black")
+        result_1 = general.is_legal_move("e10", "e9")
+        result_2 = advisor.is_legal_move("e9", "d8")
+        result_3 = elephant.is_legal_move("i8", "g10")
+        result_4 = general.is_legal_move("e8", "e7")
+        result_5 = advisor.is_legal_move("d8", "c7")
+        result_6 = elephant.is_legal_move("c6", "a4")
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6)
+        self.assertEqual(final_result, (True, True, True, False, False, False))
+
     def test_is_valid_move_general(self):
         game = XiangqiGame()
         result_1 = game.is_valid_move_general("e1", "e2")
@@ -148,6 +204,480 @@ class TestXiangqiGame(unittest.TestCase, XiangqiGame, General, Advisor, Elephant
         final_result = (result_1, result_2, result_3, result_4, result_5, result_6)
         self.assertEqual(final_result, (True, True, True, True, False, False))
 
+    def test_generals_cannot_face(self):
+        game = XiangqiGame()
+        result_1 = game.make_move('e4', 'e5')
+        result_2 = game.make_move('e7', 'e6')
+        result_3 = game.make_move('e5', 'e6')
+        result_4 = game.make_move('a10', 'a9')
+        result_5 = game.make_move('e6', 'd6')
+        result_6 = game.make_move('e6', 'f6')
+        result_7 = game.is_in_check("red")
+        result_8 = game.make_move('e6', 'e7')
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6, result_7, result_8)
+        self.assertEqual(final_result, (True, True, True, True, False, False, False, True))
+
+    def test_push_pop(self):
+        game = XiangqiGame()
+        result_1 = game.push(('b3', 'b10'))
+        result_2 = game.get_player_turn()
+        result_3 = game.pop()
+        result_4 = game.get_player_turn()
+        result_5 = game.pop()
+        result_6 = game.make_move('b3', 'b10')
+        result_7 = game.pop()
+        result_8 = game.is_valid_move_cannon('b3', 'b10')
+        result_9 = game.push(('b11', 'b10'))
+        result_10 = (game.push(('a1', 'a1')), game.to_fen() == STARTING_FEN, game.pop(),
+                     XiangqiGame().replay([('h3', 'e3'), ('a10', 'a10')], "none"))
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6, result_7, result_8, result_9,
+                        result_10)
+        self.assertEqual(final_result, (True, "black", ('b3', 'b10'), "red", None, True, ('b3', 'b10'), True, False,
+                                        (False, True, None, 1)))
+
+    def test_position_hash(self):
+        game_1 = XiangqiGame()
+        game_2 = XiangqiGame()
+        start_hash = game_1.position_hash()
+        game_1.make_move('h1', 'g3')
+        game_1.make_move('h10', 'g8')
+        game_1.make_move('b1', 'c3')
+        game_2.make_move('b1', 'c3')
+        game_2.make_move('h10', 'g8')
+        game_2.make_move('h1', 'g3')
+        result_1 = game_1.position_hash() == game_2.position_hash()
+        result_2 = game_1.position_hash() == start_hash
+        game_1.make_move('b10', 'c8')
+        result_3 = game_1.position_hash() == game_2.position_hash()
+        game_1.pop()
+        result_4 = game_1.position_hash() == game_2.position_hash()
+        final_result = (result_1, result_2, result_3, result_4)
+        self.assertEqual(final_result, (True, False, False, True))
+
+    def test_perft(self):
+        game = XiangqiGame()
+        result_1 = game.perft(1)
+        result_2 = game.perft(2)
+        divide = game.perft(2, divide=True)
+        result_3 = (len(divide), sum(divide.values()), divide[('b3', 'b10')])
+        game.make_move('h3', 'e3')
+        result_4 = game.perft(1)
+        final_result = (result_1, result_2, result_3, result_4)
+        self.assertEqual(final_result, (44, 1920, (44, 1920, 41), 45))
+
+    def test_search(self):
+        game = XiangqiGame()
+        for move in RED_WINS_MOVES[:20]:
+            game.make_move(move[0], move[1])
+        start_hash = game.position_hash()
+        search = XiangqiSearch(game)
+        result_1 = search.search(max_depth=3)
+        search.search(max_depth=10, node_limit=100)
+        result_2 = (search.get_nodes() <= 100, game.position_hash() == start_hash)
+        game.make_move('g9', 'g10')
+        result_3 = XiangqiSearch(game).search()
+        # a search stopped before its first iteration completes scores the position statically, not as mated
+        game = XiangqiGame()
+        game.make_move('h3', 'e3')
+        result_4 = XiangqiSearch(game).search(node_limit=5)
+        # a search failing low against its window has no best move to report
+        result_5 = XiangqiSearch(XiangqiGame()).search(max_depth=2, window=(500, 501))
+        final_result = (result_1, result_2, result_3, result_4, result_5)
+        self.assertEqual(final_result, ((('g9', 'g10'), MATE_SCORE - 1, [('g9', 'g10')]), (True, True),
+                                        (None, -MATE_SCORE, []), (('a10', 'a8'), -15, [('a10', 'a8')]),
+                                        (('a1', 'a2'), 500, [])))
+
+    def test_parallel(self):
+        game = XiangqiGame()
+        for move in RED_WINS_MOVES[:20]:
+            game.make_move(move[0], move[1])
+        result_1 = XiangqiGame._unpack(game._pack()).position_hash() == game.position_hash()
+        result_2 = parallel_perft(game, 2, workers=2) == game.perft(2)
+        result_3 = parallel_perft(game, 2, divide=True, workers=2) == game.perft(2, divide=True)
+        result_4 = parallel_search(game, max_depth=3, workers=2)
+        # the best move of the shallow search, g5 g6, is searched first and e5 e6 has to beat its score
+        game = XiangqiGame.from_fen("r1b1ka3/4a4/1cn1b4/pCp1p3p/6p2/4P1Pr1/P1P4cP/B1N6/8R/R2AKABN1 w")
+        result_5 = parallel_search(game, max_depth=3, workers=2) == XiangqiSearch(game).search(max_depth=3)
+        final_result = (result_1, result_2, result_3, result_4, result_5)
+        self.assertEqual(final_result, (True, True, True, (('g9', 'g10'), MATE_SCORE - 1, [('g9', 'g10')]), True))
+
+    def test_lazy_game_state(self):
+        game = XiangqiGame()
+        for move in RED_WINS_MOVES:
+            game.make_move(move[0], move[1])
+        result_1 = game.get_game_state()
+        result_2 = game.make_move('e10', 'f10')
+        result_3 = game.pop()
+        result_4 = game.get_game_state()
+        result_5 = game.push(('g9', 'g10'))
+        result_6 = game.get_game_state()
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6)
+        self.assertEqual(final_result, ("RED_WON", False, ('g9', 'g10'), "UNFINISHED", True, "RED_WON"))
+
+    def test_shared_pieces(self):
+        game_1 = XiangqiGame()
+        game_2 = XiangqiGame()
+        result_1 = game_1._board[0] is game_2._board[8] is PIECES["red"][Chariot._kind]
+        result_2 = (game_1._board[81].get_color(), game_1._board[81].get_kind())
+        result_3 = hasattr(Horse("red"), "__dict__")
+        game_1.make_move('h3', 'h10')
+        result_4 = game_1._board[88] is PIECES["red"][Cannon._kind]
+        final_result = (result_1, result_2, result_3, result_4)
+        self.assertEqual(final_result, (True, ("black", 4), False, True))
+
+    def test_check_squares(self):
+        game = XiangqiGame()
+        check_squares = game._check_squares("red")
+        result_1 = bool(check_squares >> SQUARE_INDEX['a4'] & 1)
+        result_2 = bool(check_squares >> SQUARE_INDEX['e4'] & 1)
+        result_3 = bool(check_squares >> SQUARE_INDEX['d2'] & 1)
+        for move in RED_WINS_MOVES[:13]:
+            game.make_move(move[0], move[1])
+        result_4 = game._check_squares("black")
+        result_5 = len(game._generate_legal_moves("black"))
+        final_result = (result_1, result_2, result_3, result_4, result_5)
+        self.assertEqual(final_result, (False, True, True, -1, 2))
+
+    def test_checks_and_pins(self):
+        def bits(*squares):
+            return sum(1 << SQUARE_INDEX[square] for square in squares)
+
+        game = XiangqiGame()
+        placement = {'e1': General("red"), 'e3': Chariot("red"), 'f1': Advisor("red"), 'g1': Elephant("red"),
+                     'f2': Horse("red"), 'e8': Chariot("black"), 'h1': Cannon("black"), 'f3': Horse("black"),
+                     'b1': Cannon("black"), 'f10': General("black")}
+        game._set_position({SQUARE_INDEX[square]: piece for square, piece in placement.items()}, "red")
+        checkers, evasions, pins, screens = game._position.get_checks_and_pins("red")
+        result_1 = (checkers, evasions, screens == bits('c1', 'd1'))
+        result_2 = {SQUARE_NAMES[square]: pin for square, pin in pins.items()} == {
+            'e3': bits('e2', 'e3', 'e4', 'e5', 'e6', 'e7', 'e8'), 'f1': bits('f1', 'g1', 'h1'),
+            'g1': bits('f1', 'g1', 'h1'), 'f2': bits('f3')}
+        result_3 = sorted(SQUARE_NAMES[to_index] for from_index, to_index in game._generate_legal_moves("red")
+                          if SQUARE_NAMES[from_index] in ('e3', 'f2', 'f1', 'g1'))
+        game._set_position({SQUARE_INDEX['e1']: General("red"), SQUARE_INDEX['e5']: Cannon("black"),
+                            SQUARE_INDEX['e3']: Horse("red"), SQUARE_INDEX['d10']: General("black")}, "red")
+        checkers, evasions, pins, screens = game._position.get_checks_and_pins("red")
+        result_4 = (checkers == bits('e5'), evasions == bits('e2', 'e3', 'e4', 'e5'))
+        final_result = (result_1, result_2, result_3, result_4)
+        self.assertEqual(final_result, ((0, 0, True), True, ['e2', 'e4', 'e5', 'e6', 'e7', 'e8'],
+                                        (True, True)))
+
+    def test_get_legal_moves(self):
+        def replayed_legal_moves(plies):
+            replayed = XiangqiGame()
+            replayed.replay(RED_WINS_MOVES[:plies])
+            return replayed.get_legal_moves()
+
+        game = XiangqiGame()
+        result_1 = len(game.get_legal_moves())
+        result_2 = sorted(to_square for from_square, to_square in game.get_legal_moves('b3'))
+        result_3 = (game.get_legal_moves('e5'), game.get_legal_moves('j1'))
+        result_4 = game.make_move('e1', 'e3')
+        result_5 = game.make_move('b3', 'b10')
+        result_6 = sorted(game.get_legal_moves('a10'))
+        game.pop()
+        result_7 = len(game.get_legal_moves()) == 44
+        for move in RED_WINS_MOVES:
+            game.get_legal_moves()
+            game.make_move(*move)
+        result_8 = (game.get_game_state(), game.get_legal_moves(), game.get_legal_moves('e10'))
+        # after undoing moves, the legal moves are those of a game that never made them
+        result_9 = (game.pop(), game.get_legal_moves() == replayed_legal_moves(20), game.pop(),
+                    game.pop(), game.get_legal_moves() == replayed_legal_moves(18))
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6, result_7, result_8, result_9)
+        self.assertEqual(final_result, (44, ['a3', 'b10', 'b2', 'b4', 'b5', 'b6', 'b7', 'c3', 'd3', 'e3', 'f3',
+                                             'g3'], ([], []), False, True,
+                                        [('a10', 'a8'), ('a10', 'a9'), ('a10', 'b10')], True,
+                                        ("RED_WON", [], []), (('g9', 'g10'), True, ('c7', 'c6'), ('i9', 'g9'), True)))
+
+    def test_replay(self):
+        results = []
+        for validate in ("full", "light", "none"):
+            game = XiangqiGame()
+            results.append((game.replay(RED_WINS_MOVES, validate), game.get_game_state(), len(game._undo_stack)))
+        game = XiangqiGame()
+        result_4 = (game.replay(RED_WINS_MOVES + [('e10', 'f10')], "light"), game.get_game_state())
+        game = XiangqiGame()
+        result_5 = (game.replay([('h3', 'e3'), ('h8', 'g8'), ('e1', 'e3'), ('a1', 'a2')], "light"),
+                    len(game._undo_stack), game.get_player_turn())
+        game = XiangqiGame()
+        result_6 = (game.replay([('h3', 'e3'), ('h10', 'g8'), ('e3', 'e7'), ('e10', 'e9'), ('e7', 'e9')], "full"),
+                    game.replay([('a10', 'a9')], "none"), game.replay([('a1', 'a2'), ('j1', 'a2')], "none"))
+        final_result = (results[0], results[1], results[2], result_4, result_5, result_6)
+        self.assertEqual(final_result, ((None, "RED_WON", 21), (None, "RED_WON", 21), (None, "RED_WON", 21),
+                                        (21, "RED_WON"), (2, 2, "red"), (4, None, 1)))
+
+    def test_fen(self):
+        def fen_error(fen):
+            try:
+                XiangqiGame.from_fen(fen)
+            except ValueError:
+                return True
+            return False
+
+        game = XiangqiGame()
+        result_1 = game.to_fen() == STARTING_FEN
+        game.replay(RED_WINS_MOVES)
+        result_2 = game.to_fen()
+        copy = XiangqiGame.from_fen(result_2)
+        result_3 = (copy.to_fen() == result_2, copy.position_hash() == game.position_hash(), copy.get_game_state())
+        copy = XiangqiGame.from_fen("4k4/9/9/9/9/9/9/9/4A4/3EKH3 r")
+        red = PIECES["red"]
+        result_4 = (copy.get_player_turn(), copy.get_the_board()[0][3:6] == [red[2], red[0], red[3]],
+                    copy.make_move('e2', 'f3'))
+        result_5 = (fen_error("4k4/9/9/9/9/9/9/9/9/4K4"), fen_error("4k4/9/9/9/9/9/9/9/9/4K4 x"),
+                    fen_error("4k4/9/9/9/9/9/9/9/4K4 w"), fen_error("4k4/9/9/9/9/9/9/9/9/4K5 w"),
+                    fen_error("4k4/9/9/9/9/9/9/9/9/4Q4 w"), fen_error("4k4/9/9/9/9/9/9/9/9/9 w"))
+        final_result = (result_1, result_2, result_3, result_4, result_5)
+        self.assertEqual(final_result, (True, "rn1ak1R2/4a4/4b4/p3C1p1p/2p6/9/P1P1P1P1P/4C3N/1c7/RNBAKAB2 b - - 0 1",
+                                        (True, True, "RED_WON"), ("red", True, False),
+                                        (True, True, True, True, True, True)))
+
+    def test_records(self):
+        game = XiangqiGame()
+        game.replay(RED_WINS_MOVES)
+        endgame = XiangqiGame.from_fen("3a1kb2/1c7/9/7P1/2P6/9/9/4K4/9/3N1A3 b - - 0 1")
+        endgame.make_move('b9', 'b1')
+        legal_moves = endgame.get_legal_moves()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.xqr")
+            with GameRecordWriter(path) as writer:
+                result_1 = (writer.add_game(game), writer.add_moves(RED_WINS_MOVES[:3]), writer.add_game(endgame),
+                            endgame._legal_moves is not None and endgame.get_legal_moves() == legal_moves)
+            with GameRecordReader(path) as reader:
+                result_2 = (len(reader), os.path.getsize(path) == 24 + 3 * 6 + 2 * 25 + 46 + 3 * 8)
+                result_3 = (reader.get_moves(0) == RED_WINS_MOVES, reader.get_result(0), list(reader.iter_moves(1)),
+                            reader.get_result(1))
+                result_4 = (reader.get_fen(2), reader.get_moves(2), reader.get_game(2).to_fen() == endgame.to_fen(),
+                            reader.get_game(0, "light").get_game_state())
+                result_5 = [len(game_moves) for game_moves in reader]
+        final_result = (result_1, result_2, result_3, result_4, result_5)
+        self.assertEqual(final_result, ((0, 1, 2, True), (3, True),
+                                        (True, "RED_WON", RED_WINS_MOVES[:3], "UNFINISHED"),
+                                        ("3a1kb2/1c7/9/7P1/2P6/9/9/4K4/9/3N1A3 b - - 0 1", [('b9', 'b1')], True,
+                                         "RED_WON"), [21, 3, 1]))
+
+    def test_opening_book(self):
+        games = [([('h3', 'e3'), ('h10', 'g8'), ('h1', 'g3')], "RED_WON"),
+                 ([('h3', 'e3'), ('h10', 'g8'), ('b1', 'c3')], "BLACK_WON"),
+                 ([('h3', 'e3'), ('b10', 'c8')], "UNFINISHED"),
+                 ([('c4', 'c5'), ('g7', 'g6'), ('a1', 'a9')], "RED_WON")]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.xqb")
+            result_1 = build_book(path, games)
+            result_2 = build_book(path + "2", games, max_ply=1, min_games=2)
+            with OpeningBook(path) as book:
+                game = XiangqiGame()
+                result_3 = (len(book), book.get_entries(game))
+                game.make_move('h3', 'e3')
+                result_4 = book.get_entries(game)
+                result_5 = (book.choose_move(game), XiangqiSearch(game, book=book).search(max_depth=2))
+                game.make_move('h10', 'g8')
+                result_6 = (book.get_entries(game)[1], book.choose_move(game, random.Random(1)))
+                game.make_move('b1', 'c3')
+                result_7 = (book.get_entries(game), book.choose_move(game))
+            with OpeningBook(path + "2") as book:
+                result_8 = book.get_entries(XiangqiGame())
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6, result_7, result_8)
+        self.assertEqual(final_result, (7, 1, (7, [(('h3', 'e3'), 3, 3, 3), (('c4', 'c5'), 2, 1, 2)]),
+                                        [(('h10', 'g8'), 2, 2, 2), (('b10', 'c8'), 1, 1, 1)],
+                                        (('h10', 'g8'), (('h10', 'g8'), 0, [('h10', 'g8')])),
+                                        ((('b1', 'c3'), 0, 1, 0), ('h1', 'g3')), ([], None),
+                                        [(('h3', 'e3'), 3, 3, 3)]))
+
+    def test_ucci(self):
+        game = XiangqiGame()
+        game.replay(RED_WINS_MOVES[:20])
+        output = io.StringIO()
+        engine = UCCIEngine(io.StringIO("ucci\nisready\nposition fen " + game.to_fen() + "\ngo depth 3\n"
+                                        "position startpos moves h2e2 h9g7 a0a1 x\ngo nodes 300\n"
+                                        "banmoves b7b0\ngo depth 1\n"), output)
+        engine.run()
+        lines = output.getvalue().splitlines()
+        result_1 = lines[:3]
+        result_2 = [line.split()[1] for line in lines if line.startswith("bestmove")]
+        result_3 = engine._game.to_fen()
+        result_4 = (from_ucci_move('h2e2'), to_ucci_move(('g9', 'g10')), from_ucci_move('j2e2'))
+
+        output = io.StringIO()
+        engine = UCCIEngine(io.StringIO(), output)
+        engine.handle("go depth 64")
+        engine.handle("stop")
+        result_5 = output.getvalue().splitlines()[-1].startswith("bestmove")
+        result_6 = (engine.handle("quit"), output.getvalue().splitlines()[-1])
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6)
+        self.assertEqual(final_result, (["id name XiangqiGame", "ucciok", "readyok"], ["g8g9", "b7b0", "b7c7"],
+                                        "rnbakab1r/9/1c4nc1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C4/R8/1NBAKABNR b - - 0 1",
+                                        (('h3', 'e3'), 'g8g9', None), True, (False, "bye")))
+
+    def test_server(self):
+        async def session():
+            server = XiangqiServer(workers=2)
+            listener = await server.start(port=0)
+            reader, writer = await asyncio.open_connection("127.0.0.1", listener.sockets[0].getsockname()[1])
+            writer.write(b"new\nnew 4k4/9/9/9/9/9/9/9/4A4/3EKH3 w\n")
+            answers = [(await reader.readline()).decode().strip() for command in range(2)]
+            # the moves of game 1 are sent together and must be applied in order
+            writer.write(b"move 1 h3 e3\nmove 1 h10 g8\nmove 1 e3 e7\nmove 2 e2 f3\nmove 1 e1 e3\nfen 1\n")
+            game_answers = sorted([(await reader.readline()).decode().strip() for command in range(6)],
+                                  key=lambda answer: answer.split()[1])
+            writer.write(b"state 1\nsearch 2 1\nclose 2\nstate 2\nmove\nhello\nquit\n")
+            other_answers = [(await reader.readline()).decode().strip() for command in range(7)]
+            writer.close()
+            # a game ended by repetition takes no more moves
+            reader, writer = await asyncio.open_connection("127.0.0.1", listener.sockets[0].getsockname()[1])
+            writer.write(b"new\n" + b"move 3 b1 c3\nmove 3 b10 c8\nmove 3 c3 b1\nmove 3 c8 b10\n" * 2 +
+                         b"move 3 h3 e3\nstate 3\nsearch 3 999 50\nquit\n")
+            repetition_answers = [(await reader.readline()).decode().strip() for command in range(13)]
+            writer.close()
+            # non-ASCII commands are refused, and a line over the stream limit ends the connection
+            reader, writer = await asyncio.open_connection("127.0.0.1", listener.sockets[0].getsockname()[1])
+            writer.write("h\u00e9llo\nnew 4k4/9/9/9/9/9/9/9/9/4K4 w \u00e9\n".encode() + b"x" * 70000 + b"\n")
+            bad_answers = [(await reader.readline()).decode().strip() for command in range(4)]
+            bad_answers.append(await reader.read())
+            writer.close()
+            listener.close()
+            server.close()
+            return answers, game_answers, sorted(other_answers), repetition_answers[-6:-1], sorted(bad_answers[:-1]), \
+                bad_answers[-1]
+
+        answers, game_answers, other_answers, repetition_answers, bad_answers, end = asyncio.run(session())
+        result_1 = answers
+        result_2 = game_answers
+        result_3 = other_answers
+        # a search deeper than the ply limit is clamped, and answered within its time limit
+        result_4 = (repetition_answers[:4], repetition_answers[4].split()[:2])
+        result_5 = (bad_answers, end)
+        final_result = (result_1, result_2, result_3, result_4, result_5)
+        self.assertEqual(final_result, (["ok 1", "ok 2"],
+                                        ["ok 1 UNFINISHED", "ok 1 UNFINISHED", "ok 1 UNFINISHED", "illegal 1",
+                                         "ok 1 rnbakab1r/9/1c4nc1/p1p1C1p1p/9/9/P1P1P1P1P/1C7/9/RNBAKABNR b - - 0 1",
+                                         "illegal 2"],
+                                        ["bye", "error - missing game id", "error - unknown command hello",
+                                         "error 2 no such game", "ok 1 UNFINISHED black", "ok 2",
+                                         "ok 2 f1 e3 820"],
+                                        (["ok 3 UNFINISHED", "ok 3 DRAW", "illegal 3", "ok 3 DRAW red"], ["ok", "3"]),
+                                        (["bye", "error - command is not ASCII", "error - command is not ASCII",
+                                          "error - line too long"], b"")))
+
+    def test_ray_lookups(self):
+        game = XiangqiGame.from_fen("3k5/9/9/3c5/9/9/3P5/9/3C5/4K1R2 w")
+        result_1 = (game.is_valid_move_chariot('g1', 'g10'), game.is_valid_move_chariot('g1', 'f1'),
+                    game.is_valid_move_chariot('g1', 'd1'), game.is_valid_move_chariot('g1', 'e1'))
+        result_2 = (game.is_valid_move_cannon('d2', 'd7'), game.is_valid_move_cannon('d2', 'd4'),
+                    game.is_valid_move_cannon('d2', 'd10'), game.is_valid_move_cannon('d2', 'a2'))
+        result_3 = (game.is_valid_move_general('e1', 'd1'), game.is_valid_move_general('e1', 'f1'),
+                    game._position.faces_general("black", SQUARE_INDEX['d10'], SQUARE_INDEX['d10']))
+        game = XiangqiGame.from_fen("3k5/9/9/9/9/9/9/9/9/3cK4 w")
+        result_4 = (game.is_valid_move_general('e1', 'd1'), game.make_move('e1', 'd1'))
+        final_result = (result_1, result_2, result_3, result_4)
+        self.assertEqual(final_result, ((True, True, False, True), (True, False, False, True), (True, True, False),
+                                        (False, False)))
+
+    def test_mcts(self):
+        game = XiangqiGame.from_fen("3k5/9/9/9/9/9/9/9/1R7/R3K4 w")
+        fen = game.to_fen()
+        search = XiangqiMCTS(game, seed=1)
+        best_move = search.search(playouts=200)
+        stats = search.get_root_stats()
+        result_1 = (game.to_fen() == fen, search.get_playouts(), sum(entry[1] for entry in stats))
+        repeat = XiangqiMCTS(game, seed=1)
+        result_2 = (repeat.search(playouts=200) == best_move, repeat.get_root_stats() == stats)
+        result_3 = (game.make_move(best_move[0], best_move[1]), game.get_game_state(),
+                    XiangqiMCTS(game, seed=1).search(playouts=10))
+        game = XiangqiGame()
+        first = run_playouts(game, 10, seed=3, max_plies=30)
+        second = run_playouts(game, 10, seed=3, max_plies=30)
+        result_4 = (first["red"] + first["black"] + first["unfinished"], first["score"] == second["score"],
+                    0 < first["score"] < 1, game.to_fen() == STARTING_FEN)
+        final_result = (result_1, result_2, result_3, result_4)
+        self.assertEqual(final_result, ((True, 200, 200), (True, True), (True, "RED_WON", None),
+                                        (10, True, True, True)))
+
+    def test_tablebase(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result_1 = generate_tablebase(directory, "KRk")
+            with Tablebase(directory) as tablebase:
+                result_2 = (tablebase.get_keys(), tablebase.get_max_pieces(), tablebase.probe(XiangqiGame()))
+                game = XiangqiGame.from_fen("4k4/9/9/9/9/9/9/9/R8/3K5 b")
+                # the same position with the colours swapped is read from the same table
+                mirrored = XiangqiGame.from_fen("3k5/r8/9/9/9/9/9/9/9/4K4 w")
+                result_3 = (tablebase.probe(game), tablebase.probe(mirrored))
+                result_4 = (XiangqiSearch(game).search(max_depth=5)[1],
+                            XiangqiSearch(game, tablebase=tablebase).search(max_depth=1)[1])
+                game = XiangqiGame.from_fen("3k5/9/9/9/9/9/9/9/9/4KR3 w")
+                move = tablebase.best_move(game)
+                result_5 = (tablebase.probe(game), game.make_move(move[0], move[1]), game.get_game_state(),
+                            tablebase.probe(game))
+            try:
+                generate_tablebase(directory, "KRR")
+                result_6 = None
+            except ValueError:
+                result_6 = "ValueError"
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6)
+        self.assertEqual(final_result, (["Kk", "KRk"], (["KRk", "Kk"], 3, None), ((-1, 4), (-1, 4)),
+                                        (-MATE_SCORE + 4, -MATE_SCORE + 4), ((1, 1), True, "RED_WON", (-1, 0)),
+                                        "ValueError"))
+
+    def test_repetition(self):
+        def play(game, moves):
+            return [(game.make_move(from_square, to_square), game.repetition_count(), game.get_game_state())
+                    for from_square, to_square in moves]
+
+        shuffle = [('h1', 'g3'), ('h10', 'g8'), ('g3', 'h1'), ('g8', 'h10')] * 2
+        game = XiangqiGame()
+        result_1 = play(game, shuffle)[-1]
+        game = XiangqiGame()
+        game.set_repetition_rules()
+        result_2 = (play(game, shuffle)[-1], game.make_move('h3', 'e3'), game.get_legal_moves())
+        result_3 = (game.pop(), game.repetition_count(), game.get_game_state())
+        # red checks with every move of the cycle and loses
+        game = XiangqiGame.from_fen("3k5/9/9/9/R8/9/9/9/9/5K3 w")
+        game.set_repetition_rules()
+        result_4 = play(game, [('a6', 'd6')] + [('d10', 'e10'), ('d6', 'e6'), ('e10', 'd10'), ('e6', 'd6')] * 2)[-1]
+        # red chases the unprotected Cannon with every move of the cycle and loses
+        game = XiangqiGame.from_fen("4k4/9/c8/1R7/9/9/9/9/9/3K5 w")
+        game.set_repetition_rules()
+        result_5 = play(game, [('b7', 'a7'), ('a8', 'b8'), ('a7', 'b7'), ('b8', 'a8')] * 2)[-1]
+        # replay without full validation also stops once a repetition has ended the game
+        replays = []
+        for validate in ("light", "none"):
+            game = XiangqiGame()
+            game.set_repetition_rules()
+            replays.append((game.replay(shuffle, validate), game.replay([('h3', 'e3')], validate),
+                            game.get_game_state()))
+            game = XiangqiGame()
+            game.set_repetition_rules()
+            replays.append((game.replay(shuffle + [('h3', 'e3')], validate), game.get_game_state()))
+        result_6 = replays
+        final_result = (result_1, result_2, result_3, result_4, result_5, result_6)
+        self.assertEqual(final_result, ((True, 3, "UNFINISHED"), ((True, 3, "DRAW"), False, []),
+                                        (('g8', 'h10'), 2, "UNFINISHED"), (True, 3, "BLACK_WON"),
+                                        (True, 3, "BLACK_WON"),
+                                        [(None, 0, "DRAW"), (8, "DRAW"), (None, 0, "DRAW"), (8, "DRAW")]))
+
+    def test_evaluation(self):
+        game = XiangqiGame()
+        result_1 = (evaluate(game), evaluate_full(game))
+        # the kept score follows every move and undo of a random game, captures included
+        rng = random.Random(7)
+        matches = True
+        for ply in range(60):
+            moves = game._generate_legal_moves(game.get_player_turn())
+            if not moves:
+                break
+            game._push(*rng.choice(moves))
+            matches = matches and evaluate(game) == evaluate_full(game)
+        captured = 32 - game._position.get_occupied().bit_count()
+        while game.pop() is not None:
+            matches = matches and evaluate(game) == evaluate_full(game)
+        result_2 = (matches, captured > 0, evaluate(game))
+        game = XiangqiGame.from_fen("4k4/9/9/9/9/9/9/9/9/3K1R3 w")
+        result_3 = (evaluate(game) == evaluate_full(game) > 850, game.make_move('f1', 'f5'),
+                    evaluate(game) == evaluate_full(game) < -850)
+        final_result = (result_1, result_2, result_3)
+        self.assertEqual(final_result, ((0, 0), (True, True, 0), (True, True, True)))
+
     def test_red_wins_1(self):
         game = XiangqiGame()
         result_1 = game.make_move('h3', 'e3')
@@ -0,0 +1,270 @@
+# Date: 10/18/2026
+# Description: Monte Carlo playouts and Monte Carlo tree search for XiangqiGame.
+# Writes function playout and run_playouts and class XiangqiMCTS. A playout plays random legal moves from a
+# position until one side has no legal move or a ply limit is reached, using push/pop and the bitboard move
+# tables directly: each ply draws a random piece of the side to move and then a random destination for it, so
+# only the moves actually tried are generated and tested for check. A playout cut off by the ply limit is scored
+# from the material balance. XiangqiMCTS builds a UCT search tree over the legal moves of a position with a
+# playout from each new leaf. All randomness comes from a random.Random, so a seed reproduces a run exactly.
+
+import math
+import random
+import time
+
+from XiangqiBitboard import LINES, DIAGONAL_NEIGHBOURS
+from XiangqiGame import SQUARE_NAMES
+from XiangqiEvaluation import evaluate
+
+# a playout longer than this many plies is stopped and scored from the material balance
+MAX_PLAYOUT_PLIES = 100
+# material advantage, in hundredths of a soldier, worth a 73% (1 / (1 + e^-1)) expected result
+MATERIAL_SCALE = 400
+EXPLORATION = 1.4
+
+
+def playout(game, rng, max_plies=MAX_PLAYOUT_PLIES):
+    """
+    Plays random legal moves from game's position until the side to move has no legal move or max_plies have been
+    played, undoes them, and returns the result for red: 1.0 if red won, 0.0 if black won, and otherwise the
+    expected result of the material balance, between 0 and 1
+    """
+    position = game._position
+    board = game._board
+    random_number = rng.random
+    # the squares of each side's pieces, kept up to date as moves are made so that a piece is drawn by index
+    pieces = {color: _squares(position.get_occupied(color)) for color in ("red", "black")}
+    plies = 0
+    result = None
+    while plies < max_plies:
+        color = game._player_turn
+        own = pieces[color]
+        # as in XiangqiGame._check_squares, only a move changing the occupancy of the General's lines or
+        # Horse legs can leave it in check, and a piece arriving on a leg only blocks it
+        if game.is_in_check(color):
+            leaving = entering = -1
+        else:
+            general = game._red_general_location if color == "red" else game._black_general_location
+            entering = LINES[general]
+            leaving = entering | DIAGONAL_NEIGHBOURS[general]
+        move = None
+
+        # draw pieces without replacement, and each piece's destinations without replacement, until one is legal
+        candidates = own[:]
+        while candidates:
+            index = int(random_number() * len(candidates))
+            from_index = candidates[index]
+            candidates[index] = candidates[-1]
+            candidates.pop()
+            destinations = position.get_moves(color, board[from_index]._kind, from_index)
+            while destinations:
+                # the lowest set bit after clearing a random number of them is a random destination
+                remaining = destinations
+                for skip in range(int(random_number() * destinations.bit_count())):
+                    remaining &= remaining - 1
+                to_index = (remaining & -remaining).bit_length() - 1
+                if not (leaving >> from_index & 1 or entering >> to_index & 1):
+                    move = from_index, to_index
+                    break
+                game._push(from_index, to_index)
+                in_check = game.is_in_check(color)
+                game._pop()
+                if not in_check:
+                    move = from_index, to_index
+                    break
+                destinations ^= 1 << to_index
+            if move is not None:
+                break
+
+        if move is None:
+            result = 0.0 if color == "red" else 1.0
+            break
+        from_index, to_index = move
+        if board[to_index] is not None:
+            pieces["black" if color == "red" else "red"].remove(to_index)
+        own[own.index(from_index)] = to_index
+        game._push(from_index, to_index)
+        plies += 1
+
+    if result is None:
+        score = evaluate(game)
+        if game._player_turn == "black":
+            score = -score
+        result = 1 / (1 + math.exp(-score / MATERIAL_SCALE))
+    for ply in range(plies):
+        game._pop()
+    return result
+
+
+def _squares(bitboard):
+    """
+    Returns the list of square indexes set in bitboard
+    """
+    squares = []
+    while bitboard:
+        bit = bitboard & -bitboard
+        bitboard ^= bit
+        squares.append(bit.bit_length() - 1)
+    return squares
+
+
+def run_playouts(game, count, seed=None, max_plies=MAX_PLAYOUT_PLIES):
+    """
+    Runs count playouts from game's position and returns a dict with the number of 'red' and 'black' wins, the
+    'unfinished' playouts stopped at max_plies, the mean 'score' for red and 'playouts_per_second'
+    """
+    rng = random.Random(seed)
+    stats = {"red": 0, "black": 0, "unfinished": 0, "score": 0.0}
+    start = time.perf_counter()
+    for number in range(count):
+        result = playout(game, rng, max_plies)
+        if result == 1.0:
+            stats["red"] += 1
+        elif result == 0.0:
+            stats["black"] += 1
+        else:
+            stats["unfinished"] += 1
+        stats["score"] += result
+    elapsed = time.perf_counter() - start
+    stats["score"] /= max(count, 1)
+    stats["playouts_per_second"] = count / max(elapsed, 1e-9)
+    return stats
+
+
+class _Node:
+    """
+    Represents a node of the search tree with _move, _parent, _children, _untried, _decisive, _visits and _value
+    data members.
+    _value is the sum of the playout results for the player who made _move, so that a parent picks the child
+    best for the player to move at the parent; _decisive is a child after which the other player has no legal
+    move, and so wins outright
+    """
+
+    __slots__ = ("_move", "_parent", "_children", "_untried", "_decisive", "_visits", "_value")
+
+    def __init__(self, move, parent, untried):
+        self._move = move
+        self._parent = parent
+        self._children = []
+        self._untried = untried
+        self._decisive = None
+        self._visits = 0
+        self._value = 0.0
+
+
+class XiangqiMCTS:
+    """
+    Represents a Monte Carlo tree search over a XiangqiGame with _game, _rng, _exploration, _max_plies, _root,
+    _playouts and _elapsed data members.
+    """
+
+    def __init__(self, game, seed=None, exploration=EXPLORATION, max_plies=MAX_PLAYOUT_PLIES):
+        """
+        Returns a XiangqiMCTS over game drawing its random numbers from a random.Random seeded with seed, with
+        exploration as the UCT exploration constant and playouts cut off after max_plies plies
+        """
+        self._game = game
+        self._rng = random.Random(seed)
+        self._exploration = exploration
+        self._max_plies = max_plies
+        self._root = None
+        self._playouts = 0
+        self._elapsed = 0.0
+
+    def get_playouts(self):
+        """
+        Returns the number of playouts run by the last search
+        """
+        return self._playouts
+
+    def get_playouts_per_second(self):
+        """
+        Returns the playout rate of the last search
+        """
+        return self._playouts / max(self._elapsed, 1e-9)
+
+    def get_root_stats(self):
+        """
+        Returns a list of (move, visits, mean result) for each root move the last search tried, with moves as
+        (from_square, to_square) tuples and mean results for the player to move at the root, most visited first
+        """
+        if self._root is None:
+            return []
+        stats = [((SQUARE_NAMES[child._move[0]], SQUARE_NAMES[child._move[1]]), child._visits,
+                  child._value / child._visits) for child in self._root._children]
+        stats.sort(key=lambda entry: entry[1], reverse=True)
+        return stats
+
+    def search(self, playouts=1000, time_limit=None):
+        """
+        Grows a new search tree from the current position by playouts playouts, or for time_limit seconds if
+        given, and returns a root move that wins outright if one was found, or else the most visited root move, as
+        a (from_square, to_square) tuple, or None if the side to move has no legal move
+        """
+        self._root = _Node(None, None, self._shuffled_moves())
+        self._playouts = 0
+        start = time.perf_counter()
+        deadline = None if time_limit is None else start + time_limit
+        while (deadline is None and self._playouts < playouts) or \
+                (deadline is not None and time.perf_counter() < deadline):
+            self._iterate()
+            self._playouts += 1
+            if not self._root._children and not self._root._untried:
+                break
+        self._elapsed = time.perf_counter() - start
+
+        decisive = self._root._decisive
+        if decisive is not None:
+            return SQUARE_NAMES[decisive._move[0]], SQUARE_NAMES[decisive._move[1]]
+        stats = self.get_root_stats()
+        return stats[0][0] if stats else None
+
+    def _shuffled_moves(self):
+        """
+        Returns the legal moves of the current position in random order
+        """
+        moves = self._game._generate_legal_moves(self._game._player_turn)
+        self._rng.shuffle(moves)
+        return moves
+
+    def _iterate(self):
+        """
+        Runs one selection, expansion, playout and backpropagation from the root
+        """
+        game = self._game
+        node = self._root
+
+        # selection: descend through fully expanded nodes by UCT, and always into a move that wins outright
+        while node._decisive is not None or (not node._untried and node._children):
+            if node._decisive is not None:
+                node = node._decisive
+            else:
+                log_visits = math.log(node._visits)
+                exploration = self._exploration
+                node = max(node._children, key=lambda child: child._value / child._visits +
+                           exploration * math.sqrt(log_visits / child._visits))
+            game._push(node._move[0], node._move[1])
+
+        # expansion: add one untried move
+        if node._untried:
+            move = node._untried.pop()
+            game._push(move[0], move[1])
+            child = _Node(move, node, self._shuffled_moves())
+            node._children.append(child)
+            if not child._untried:
+                node._decisive = child
+            node = child
+
+        # playout, or the known result of a position with no legal moves
+        if not node._untried and not node._children:
+            result = 0.0 if game._player_turn == "red" else 1.0
+        else:
+            result = playout(game, self._rng, self._max_plies)
+
+        # backpropagation: each node scores the result for the player who made its move
+        while node is not None:
+            node._visits += 1
+            if node._move is not None:
+                mover = "black" if game._player_turn == "red" else "red"
+                node._value += result if mover == "red" else 1 - result
+                game._pop()
+            node = node._parent
@@ -0,0 +1,145 @@
+# Date: 10/18/2026
+# Description: Process-pool parallel perft and root-split search for XiangqiGame.
+# Splits the legal moves at the root of a position across a concurrent.futures.ProcessPoolExecutor.
+# Workers receive the position in the compact form produced by XiangqiGame._pack together with the
+# root move to play, and results are merged in root move order so that the output does not depend on
+# which worker finished first. The search plays the most promising root move first and hands its score to
+# the searches of the other root moves as the bound they must beat.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from XiangqiGame import XiangqiGame, SQUARE_NAMES, SQUARE_INDEX
+from XiangqiSearch import XiangqiSearch, MATE_SCORE, MAX_PLY
+
+
+def _perft_worker(task):
+    """
+    Returns the perft count below one root move; task is (packed position, from_index, to_index, depth)
+    """
+    packed, from_index, to_index, depth = task
+    game = XiangqiGame._unpack(packed)
+    game._push(from_index, to_index)
+    return game._perft(depth - 1)
+
+
+def _search_worker(task):
+    """
+    Searches the position after one root move and returns (complete, score, pv, nodes), where score is
+    from the point of view of the player making the root move and complete is False if the budget ran out
+    before the search reached depth; task is (packed position, from_index, to_index, depth, node_limit,
+    deadline, window) with deadline in time.time() seconds or None, and window, if not None, the (alpha, beta) scores
+    to search the root move within, as XiangqiSearch.search does
+    """
+    packed, from_index, to_index, depth, node_limit, deadline, window = task
+    game = XiangqiGame._unpack(packed)
+    game._push(from_index, to_index)
+    time_limit = None
+    if deadline is not None:
+        time_limit = deadline - time.time()
+        if time_limit <= 0:
+            return False, 0, [], 0
+
+    # the position after the root move is searched from the other player's point of view
+    if window is not None:
+        window = (-window[1], -window[0])
+    search = XiangqiSearch(game)
+    best_move, score, pv = search.search(max_depth=depth, node_limit=node_limit, time_limit=time_limit,
+                                         window=window)
+    complete = best_move is None or search.get_depth() >= depth or \
+        (search.get_depth() > 0 and abs(score) >= MATE_SCORE - MAX_PLY)
+    # a mate seen from after the root move is one ply further away from the root
+    if score >= MATE_SCORE - MAX_PLY:
+        score -= 1
+    elif score <= -MATE_SCORE + MAX_PLY:
+        score += 1
+    return complete, -score, pv, search.get_nodes()
+
+
+def parallel_perft(game, depth, divide=False, workers=None):
+    """
+    Returns the same result as game.perft(depth, divide), counting the subtree below each root move in
+    a separate process of a pool of workers processes (os.cpu_count() by default)
+    """
+    root_moves = game._generate_legal_moves(game.get_player_turn())
+    if depth <= 1:
+        return game.perft(depth, divide)
+
+    packed = game._pack()
+    tasks = [(packed, from_index, to_index, depth) for from_index, to_index in root_moves]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        counts = list(executor.map(_perft_worker, tasks))
+
+    if divide:
+        return {(SQUARE_NAMES[move[0]], SQUARE_NAMES[move[1]]): count for move, count in zip(root_moves, counts)}
+    return sum(counts)
+
+
+def parallel_search(game, max_depth=64, node_limit=None, time_limit=None, workers=None):
+    """
+    Searches game's position to max_depth plies like XiangqiSearch.search, searching each root move in a separate
+    process of a pool of workers processes (os.cpu_count() by default) by its own iterative deepening to
+    max_depth - 1 plies. The best move of a two-ply search is searched first, and the other root moves are then
+    searched with a null window on its score, which cuts their searches off as soon as they cannot beat it; only
+    the moves that do are searched again for their exact scores.
+    node_limit caps the nodes visited over the whole search, shared evenly between the root moves of each of
+    these steps; time_limit is in seconds. A root move whose search the budget cut short cannot replace the first
+    one, and ties between equal scores go to the first move, then to the earlier root move in generation order.
+    Returns (best_move, score, pv) as XiangqiSearch.search does
+    """
+    root_moves = game._generate_legal_moves(game.get_player_turn())
+    if not root_moves:
+        return None, -MATE_SCORE, []
+
+    deadline = None if time_limit is None else time.time() + time_limit
+    depth = max(max_depth - 1, 1)
+    move_node_limit = None if node_limit is None else max(node_limit // (len(root_moves) + 1), 1)
+    # order the root moves by a shallow search
+    search = XiangqiSearch(game)
+    first_move = search.search(max_depth=min(max_depth, 2), node_limit=move_node_limit)[0]
+    nodes = search.get_nodes()
+    first = root_moves.index((SQUARE_INDEX[first_move[0]], SQUARE_INDEX[first_move[1]]))
+    root_moves = [root_moves[first]] + root_moves[:first] + root_moves[first + 1:]
+
+    packed = game._pack()
+    from_index, to_index = root_moves[0]
+    result = _search_worker((packed, from_index, to_index, depth, move_node_limit, deadline, None))
+    nodes += result[3]
+    best_move = (SQUARE_NAMES[from_index], SQUARE_NAMES[to_index])
+    best_score = result[1]
+    best_pv = [best_move] + result[2]
+    if best_score >= MATE_SCORE - MAX_PLY or len(root_moves) == 1:
+        return best_move, best_score, best_pv
+
+    # every other root move is searched against the first move's score alone, so that the results, merged in root
+    # move order, do not depend on which worker finished first. A first move that is mated is searched past with a
+    # full window instead, since a mate score seen from after a root move is one ply off
+    alpha = best_score
+    window = None if alpha <= -MATE_SCORE + MAX_PLY else (alpha, alpha + 1)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        tasks = [(packed, from_index, to_index, depth, move_node_limit, deadline, window)
+                 for from_index, to_index in root_moves[1:]]
+        results = list(executor.map(_search_worker, tasks))
+        nodes += sum(result[3] for result in results)
+        better = [index for index, result in enumerate(results, 1) if result[0] and result[1] > alpha]
+        if window is not None and better:
+            # a move that beats the null window is searched again above alpha for its exact score
+            research_node_limit = None
+            if node_limit is not None:
+                research_node_limit = max((node_limit - nodes) // len(better), 1)
+            tasks = [(packed, root_moves[index][0], root_moves[index][1], depth, research_node_limit, deadline,
+                      (alpha, MATE_SCORE + 1)) for index in better]
+            results = [None] * len(root_moves)
+            for index, result in zip(better, executor.map(_search_worker, tasks)):
+                results[index] = result
+        else:
+            results = [None] + results
+
+    for index in better:
+        result = results[index]
+        if result[0] and result[1] > best_score:
+            best_move = (SQUARE_NAMES[root_moves[index][0]], SQUARE_NAMES[root_moves[index][1]])
+            best_score = result[1]
+            best_pv = [best_move] + result[2]
+    return best_move, best_score, best_pv
@@ -0,0 +1,86 @@
+# Date: 10/18/2026
+# Description: Perft benchmark and regression gate for XiangqiGame.
+# Runs XiangqiGame.perft from the opening position and from middlegame and endgame positions with
+# cannon screens, facing generals and hobbled horses, reports nodes per second, and checks every count
+# against its expected value. The opening counts are the published xiangqi perft values; the other
+# counts come from an independent, deliberately simple implementation of the rules.
+# Exits with status 1 if any count differs, so it can gate changes to the rules code.
+# With --parallel, the subtrees below the root moves are counted across a process pool.
+# Usage: python XiangqiPerft.py [max_depth] [--divide] [--parallel]
+
+import sys
+import time
+
+from XiangqiGame import XiangqiGame, STARTING_FEN
+from XiangqiParallel import parallel_perft
+
+# each position is given by its FEN string
+PERFT_POSITIONS = [
+    {
+        "name": "opening",
+        "fen": STARTING_FEN,
+        "counts": {1: 44, 2: 1920, 3: 79666, 4: 3290240, 5: 133312995},
+    },
+    {
+        # black's General faces red's along the e-file with red's e4 Soldier as the only blocker, black's Cannon
+        # on h1 captures over the g1 Elephant inside red's palace, and several Horses are hobbled
+        "name": "middlegame",
+        "fen": "rnbak1bnr/9/3a5/1Cp3p1C/p2c5/P7P/2P1P1P2/B5N2/9/R3KABc1 b - - 0 1",
+        "counts": {1: 44, 2: 1390, 3: 60242},
+    },
+    {
+        # red's Horse, Advisor and two crossed Soldiers against black's Cannon, Advisor and Elephant
+        "name": "endgame",
+        "fen": "3a1kb2/1c7/9/7P1/2P6/9/9/4K4/9/3N1A3 b - - 0 1",
+        "counts": {1: 21, 2: 252, 3: 4555, 4: 58222},
+    },
+]
+
+
+def setup_position(position):
+    """
+    Returns a XiangqiGame at position, set up from its FEN string
+    """
+    return XiangqiGame.from_fen(position["fen"])
+
+
+def run_perft(max_depth=3, divide=False, positions=PERFT_POSITIONS, parallel=False):
+    """
+    Runs perft on every position up to max_depth, printing counts and nodes per second,
+    and returns True if every count matches its expected value. With parallel=True, runs parallel_perft
+    """
+    all_passed = True
+    for position in positions:
+        game = setup_position(position)
+        for depth in sorted(position["counts"]):
+            if depth > max_depth:
+                break
+            start = time.perf_counter()
+            nodes = parallel_perft(game, depth) if parallel else game.perft(depth)
+            elapsed = time.perf_counter() - start
+            expected = position["counts"][depth]
+            status = "ok" if nodes == expected else "MISMATCH (expected %d)" % expected
+            if nodes != expected:
+                all_passed = False
+            print("%-12s depth %d  %12d nodes  %8.2f s  %10.0f nodes/s  %s"
+                  % (position["name"], depth, nodes, elapsed, nodes / max(elapsed, 1e-9), status))
+
+        if divide:
+            for move, count in sorted(game.perft(max_depth, divide=True).items()):
+                print("    %s%s: %d" % (move[0], move[1], count))
+    return all_passed
+
+
+def main():
+    max_depth = 3
+    divide = "--divide" in sys.argv
+    parallel = "--parallel" in sys.argv
+    arguments = [argument for argument in sys.argv[1:] if argument not in ("--divide", "--parallel")]
+    if arguments:
+        max_depth = int(arguments[0])
+    if not run_perft(max_depth, divide, parallel=parallel):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# Date: 10/18/2026
+# Description: Compact binary game records for XiangqiGame.
+# Writes classes GameRecordWriter and GameRecordReader. A record file holds any number of games, each stored as
+# a fixed game header followed by its starting FEN, if it does not start from the opening position, and two bytes
+# per move (from square index, to square index). An index of game offsets at the end of the file makes every
+# game reachable by number, and the reader memory-maps the file so that only the games asked for are read.
+#
+# File layout, all integers little-endian:
+#   file header   magic b"XQGR", version (u16), reserved (u16), game count (u64), index offset (u64)
+#   game header   ply count (u16), result (u8: 0 unfinished, 1 red won, 2 black won, 3 draw), reserved (u8),
+#                 starting FEN length (u16, 0 for the opening position)
+#   game body     starting FEN (ASCII), then from and to square index bytes for each ply
+#   index         one u64 file offset per game, in game number order
+
+import mmap
+import struct
+import sys
+from array import array
+
+from XiangqiGame import XiangqiGame, SQUARE_INDEX, SQUARE_NAMES, STARTING_FEN
+
+MAGIC = b"XQGR"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHQQ")
+GAME_HEADER = struct.Struct("<HBBH")
+RESULTS = ("UNFINISHED", "RED_WON", "BLACK_WON", "DRAW")
+MAX_PLIES = 0xFFFF
+
+
+class GameRecordWriter:
+    """
+    Represents a record file open for writing with _file, _offsets and _closed data members.
+    _offsets holds the file offset of each game written so far and is written out as the index by close.
+    Use as a context manager, or call close when done; the file is not readable until it is closed
+    """
+
+    def __init__(self, path):
+        """
+        Creates or truncates the record file at path
+        """
+        self._file = open(path, "wb")
+        self._offsets = array("Q")
+        self._closed = False
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def add_game(self, game):
+        """
+        Writes the moves made in game, from the position it started at, with its current game state as the result,
+        and returns the number of the game in the file
+        """
+        moves = [(record[0], record[1]) for record in game._undo_stack]
+        return self._write(moves, game.get_game_state(), game._starting_fen())
+
+    def add_moves(self, moves, result="UNFINISHED", fen=None):
+        """
+        Writes a game given as a list of (from_square, to_square) moves, for example [('h3', 'e3'), ('h10', 'g8')],
+        played from the position of fen or from the opening position, with result one of 'UNFINISHED', 'RED_WON',
+        'BLACK_WON' or 'DRAW', and returns the number of the game in the file.
+        The moves are not checked for legality; raises ValueError if a square is not on the board
+        """
+        try:
+            indexes = [(SQUARE_INDEX[from_square], SQUARE_INDEX[to_square]) for from_square, to_square in moves]
+        except KeyError as error:
+            raise ValueError("square not on the board: %s" % error)
+        return self._write(indexes, result, fen or STARTING_FEN)
+
+    def _write(self, moves, result, fen):
+        """
+        Writes a game of (from_index, to_index) moves and returns its number
+        """
+        if self._closed:
+            raise ValueError("record file is closed")
+        if len(moves) > MAX_PLIES:
+            raise ValueError("game has more than %d plies" % MAX_PLIES)
+        if result not in RESULTS:
+            raise ValueError("result must be one of %s, not %r" % (", ".join(RESULTS), result))
+        fen_bytes = b"" if fen == STARTING_FEN else fen.encode("ascii")
+        self._offsets.append(self._file.tell())
+        self._file.write(GAME_HEADER.pack(len(moves), RESULTS.index(result), 0, len(fen_bytes)))
+        self._file.write(fen_bytes)
+        self._file.write(bytes(index for move in moves for index in move))
+        return len(self._offsets) - 1
+
+    def close(self):
+        """
+        Writes the index and the file header and closes the file
+        """
+        if self._closed:
+            return
+        index_offset = self._file.tell()
+        if sys.byteorder == "big":
+            self._offsets.byteswap()
+        self._file.write(self._offsets.tobytes())
+        self._file.seek(0)
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, len(self._offsets), index_offset))
+        self._file.close()
+        self._closed = True
+
+
+class GameRecordReader:
+    """
+    Represents a record file open for reading with _file, _map, _game_count and _index_offset data members.
+    The file is memory-mapped, so games are read on demand by number without loading the whole file.
+    Use as a context manager, or call close when done
+    """
+
+    def __init__(self, path):
+        """
+        Opens the record file at path. Raises ValueError if it is not a record file written by GameRecordWriter
+        """
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("%s is not a game record file" % path)
+        if len(self._map) < FILE_HEADER.size:
+            self.close()
+            raise ValueError("%s is not a game record file" % path)
+        magic, version, reserved, self._game_count, self._index_offset = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("%s is not a version %d game record file" % (path, VERSION))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._game_count
+
+    def __iter__(self):
+        """
+        Yields the moves of each game in order, as get_moves returns them
+        """
+        for number in range(self._game_count):
+            yield self.get_moves(number)
+
+    def close(self):
+        """
+        Unmaps and closes the file
+        """
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _locate(self, number):
+        """
+        Returns (ply count, result, starting FEN or None, offset of the first move) of game number
+        """
+        if not 0 <= number < self._game_count:
+            raise IndexError("game number %d out of range" % number)
+        offset = struct.unpack_from("<Q", self._map, self._index_offset + 8 * number)[0]
+        plies, result, reserved, fen_length = GAME_HEADER.unpack_from(self._map, offset)
+        offset += GAME_HEADER.size
+        fen = None
+        if fen_length:
+            fen = self._map[offset:offset + fen_length].decode("ascii")
+        return plies, RESULTS[result], fen, offset + fen_length
+
+    def get_result(self, number):
+        """
+        Returns the result recorded for game number; either 'UNFINISHED', 'RED_WON', 'BLACK_WON' or 'DRAW'
+        """
+        return self._locate(number)[1]
+
+    def get_fen(self, number):
+        """
+        Returns the FEN string of the position game number started from
+        """
+        return self._locate(number)[2] or STARTING_FEN
+
+    def get_moves(self, number):
+        """
+        Returns the moves of game number as a list of (from_square, to_square) tuples
+        """
+        plies, result, fen, offset = self._locate(number)
+        data = self._map[offset:offset + 2 * plies]
+        return [(SQUARE_NAMES[data[ply]], SQUARE_NAMES[data[ply + 1]]) for ply in range(0, 2 * plies, 2)]
+
+    def iter_moves(self, number):
+        """
+        Yields the moves of game number one (from_square, to_square) tuple at a time, reading them from the map
+        as they are needed
+        """
+        plies, result, fen, offset = self._locate(number)
+        game_map = self._map
+        for ply_offset in range(offset, offset + 2 * plies, 2):
+            yield SQUARE_NAMES[game_map[ply_offset]], SQUARE_NAMES[game_map[ply_offset + 1]]
+
+    def get_game(self, number, validate="none"):
+        """
+        Returns a XiangqiGame with the moves of game number made from its starting position, checking them as
+        XiangqiGame.replay does for validate. Raises ValueError if a move cannot be made
+        """
+        plies, result, fen, offset = self._locate(number)
+        game = XiangqiGame.from_fen(fen) if fen else XiangqiGame()
+        ply = game.replay(self.get_moves(number), validate)
+        if ply is not None:
+            raise ValueError("illegal move at ply %d of game %d" % (ply, number))
+        return game
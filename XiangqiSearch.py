@@ -0,0 +1,357 @@
+# Date: 10/18/2026
+# Description: Alpha-beta search for XiangqiGame.
+# Writes classes TranspositionTable and XiangqiSearch. XiangqiSearch runs a negamax alpha-beta search with
+# iterative deepening, a capture-only quiescence search and a size-bounded transposition table over a
+# XiangqiGame, using push/pop to walk the tree, and returns a best move, its score and the principal variation
+# for the current position within a depth, node or time budget. Positions are scored by XiangqiEvaluation.evaluate,
+# which reads the material and piece-square score the game keeps up to date move by move.
+
+import time
+
+from XiangqiGame import SQUARE_NAMES
+from XiangqiEvaluation import PIECE_VALUES, evaluate
+
+# scores are in hundredths of a soldier, from the point of view of the side to move
+MATE_SCORE = 100000
+MAX_PLY = 128
+
+# transposition table bound types
+EXACT, LOWER_BOUND, UPPER_BOUND = range(3)
+
+
+class TranspositionTable:
+    """
+    Represents a size-bounded transposition table with _entries and _max_entries data members.
+    _entries maps a position hash to (depth, score, bound, move); once _max_entries is reached the oldest
+    entry is evicted to make room.
+    """
+
+    def __init__(self, max_entries=1 << 20):
+        self._entries = {}
+        self._max_entries = max_entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, position_hash):
+        """
+        Returns the (depth, score, bound, move) entry stored for position_hash, or None
+        """
+        return self._entries.get(position_hash)
+
+    def store(self, position_hash, depth, score, bound, move):
+        """
+        Stores an entry for position_hash, evicting the oldest entry if the table is full
+        """
+        entries = self._entries
+        if position_hash not in entries and len(entries) >= self._max_entries:
+            del entries[next(iter(entries))]
+        entries[position_hash] = (depth, score, bound, move)
+
+    def clear(self):
+        """
+        Removes all entries
+        """
+        self._entries.clear()
+
+
+class _SearchAborted(Exception):
+    """
+    Raised inside the search when the node or time budget runs out
+    """
+
+
+class XiangqiSearch:
+    """
+    Represents a search over a XiangqiGame with _game, _table, _book, _tablebase, _nodes, _depth, _node_limit,
+    _deadline, _stopped and _pv data members.
+    """
+
+    def __init__(self, game, table_size=1 << 20, book=None, tablebase=None):
+        """
+        Returns a XiangqiSearch over game with an empty transposition table of at most table_size entries,
+        answering positions found in book, an XiangqiBook.OpeningBook, without searching, and scoring positions
+        of tablebase material, with tablebase a XiangqiTablebase.Tablebase, from their tables
+        """
+        self._game = game
+        self._table = TranspositionTable(table_size)
+        self._book = book
+        self._tablebase = tablebase
+        self._nodes = 0
+        self._depth = 0
+        self._node_limit = None
+        self._deadline = None
+        self._stopped = False
+        self._pv = [[] for ply in range(MAX_PLY + 1)]
+
+    def get_nodes(self):
+        """
+        Returns the number of nodes visited by the last search
+        """
+        return self._nodes
+
+    def get_depth(self):
+        """
+        Returns the depth of the last iteration completed by the last search
+        """
+        return self._depth
+
+    def stop(self):
+        """
+        Asks a search running in another thread to stop at its next node; search then returns the result of the
+        last completed iteration
+        """
+        self._stopped = True
+
+    def search(self, max_depth=64, node_limit=None, time_limit=None, callback=None, window=None):
+        """
+        Searches the current position by iterative deepening up to max_depth plies, stopping early once
+        node_limit nodes have been visited, time_limit seconds have passed or stop is called.
+        callback, if given, is called after each completed iteration with the depth, score and principal variation.
+        window, if given, is an (alpha, beta) pair of scores to search within: a score at or below alpha is then
+        only an upper bound, with best_move the first legal move and pv empty, and a score at or above beta only a
+        lower bound.
+        Returns (best_move, score, pv): the best (from_square, to_square) move, its score from the point of
+        view of the side to move, and the principal variation as a list of moves. best_move is None and pv
+        is empty if the side to move has no legal moves. If the budget runs out before the first iteration
+        completes, best_move is the first legal move and score the static evaluation of the position.
+        A position in the book is answered with its highest-weight book move, with a score of 0, and a position in
+        the tablebase with its tablebase move
+        """
+        game = self._game
+        self._nodes = 0
+        self._depth = 0
+        if self._book is not None:
+            book_move = self._book.choose_move(game)
+            if book_move is not None:
+                return book_move, 0, [book_move]
+        if self._tablebase is not None:
+            tablebase_move = self._tablebase.best_move(game)
+            if tablebase_move is not None:
+                return tablebase_move, self._tablebase_score(0), [tablebase_move]
+        self._node_limit = node_limit
+        self._deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self._stopped = False
+        undo_depth = len(game._undo_stack)
+
+        alpha, beta = (-MATE_SCORE - 1, MATE_SCORE + 1) if window is None else window
+        best_move = None
+        best_score = -MATE_SCORE
+        best_pv = []
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._negamax(depth, alpha, beta, 0)
+            except _SearchAborted:
+                # unwind the moves left on the board by the aborted iteration
+                while len(game._undo_stack) > undo_depth:
+                    game._pop()
+                break
+            self._depth = depth
+            best_score = score
+            # below the window no move is known to be best, and the table holds only upper bounds to extend from
+            best_pv = self._principal_variation(depth) if score > alpha else []
+            best_move = best_pv[0] if best_pv else None
+            if callback is not None:
+                callback(depth, score, [self._to_squares(move) for move in best_pv])
+
+            # a forced mate cannot be improved on by searching deeper
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break
+
+        if best_move is None:
+            # no iteration finished, every move failed low against window, or the side to move has no legal moves
+            legal_moves = game._generate_legal_moves(game.get_player_turn())
+            if not legal_moves:
+                return None, -MATE_SCORE, []
+            best_move = legal_moves[0]
+            if self._depth == 0:
+                # nothing was searched, so the score is only the static evaluation
+                best_pv = [best_move]
+                best_score = evaluate(game)
+        return self._to_squares(best_move), best_score, [self._to_squares(move) for move in best_pv]
+
+    def _to_squares(self, move):
+        """
+        Returns the (from_index, to_index) move as a (from_square, to_square) tuple
+        """
+        return SQUARE_NAMES[move[0]], SQUARE_NAMES[move[1]]
+
+    def _principal_variation(self, depth):
+        """
+        Returns the principal variation of the last completed iteration, extended to depth plies with the
+        transposition table's moves where a table cutoff ended the recorded variation early
+        """
+        game = self._game
+        pv = list(self._pv[0])
+        for move in pv:
+            game._push(move[0], move[1])
+        seen = {game._hash}
+        while len(pv) < depth:
+            entry = self._table.get(game._hash)
+            if entry is None or entry[3] not in game._generate_legal_moves(game.get_player_turn()):
+                break
+            game._push(entry[3][0], entry[3][1])
+            pv.append(entry[3])
+            if game._hash in seen:
+                break
+            seen.add(game._hash)
+        for move in pv:
+            game._pop()
+        return pv
+
+    def _tablebase_score(self, ply):
+        """
+        Returns the tablebase score of the current position at ply, with mates scored as in the search, or None if
+        the position is not in the tablebase
+        """
+        if self._game._position.get_occupied().bit_count() > self._tablebase.get_max_pieces():
+            return None
+        probe = self._tablebase.probe(self._game)
+        if probe is None:
+            return None
+        result, plies = probe
+        if result == 0:
+            return 0
+        return result * (MATE_SCORE - ply - plies)
+
+    def _count_node(self):
+        """
+        Counts a node and raises _SearchAborted once the node or time budget is spent or stop has been called
+        """
+        self._nodes += 1
+        if self._stopped:
+            raise _SearchAborted()
+        if self._node_limit is not None and self._nodes >= self._node_limit:
+            raise _SearchAborted()
+        if self._deadline is not None and self._nodes & 1023 == 0 and time.perf_counter() >= self._deadline:
+            raise _SearchAborted()
+
+    def _ordered_moves(self, color, hash_move):
+        """
+        Returns color's pseudo-legal moves with hash_move first, then captures by most valuable victim
+        and least valuable attacker, then quiet moves
+        """
+        board = self._game._board
+        scored = []
+        for move in self._game._generate_moves(color):
+            if move == hash_move:
+                order = 1 << 20
+            else:
+                victim = board[move[1]]
+                if victim is None:
+                    order = 0
+                else:
+                    order = 10 * PIECE_VALUES[victim._kind] - PIECE_VALUES[board[move[0]]._kind] + 10000
+            scored.append((order, move))
+        scored.sort(key=lambda entry: entry[0], reverse=True)
+        return [move for order, move in scored]
+
+    def _negamax(self, depth, alpha, beta, ply):
+        """
+        Returns the score of the current position searched to depth plies within the (alpha, beta) window,
+        and records the principal variation from ply in _pv[ply]
+        """
+        game = self._game
+        self._count_node()
+        self._pv[ply] = []
+
+        if self._tablebase is not None and ply > 0:
+            score = self._tablebase_score(ply)
+            if score is not None:
+                return score
+
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(alpha, beta, ply)
+
+        # probe the transposition table; mate scores are stored relative to the node
+        position_hash = game._hash
+        entry = self._table.get(position_hash)
+        hash_move = None
+        if entry is not None:
+            entry_depth, entry_score, bound, hash_move = entry
+            if entry_score > MATE_SCORE - MAX_PLY:
+                entry_score -= ply
+            elif entry_score < -MATE_SCORE + MAX_PLY:
+                entry_score += ply
+            if entry_depth >= depth and ply > 0 and \
+                    (bound == EXACT or (bound == LOWER_BOUND and entry_score >= beta) or
+                     (bound == UPPER_BOUND and entry_score <= alpha)):
+                return entry_score
+
+        color = game.get_player_turn()
+        original_alpha = alpha
+        best_score = -MATE_SCORE - 1
+        best_move = None
+        legal_moves = 0
+
+        check_squares = game._check_squares(color)
+        for move in self._ordered_moves(color, hash_move):
+            game._push(move[0], move[1])
+            if (check_squares >> move[0] & 1 or check_squares >> move[1] & 1) and game.is_in_check(color):
+                game._pop()
+                continue
+            legal_moves += 1
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            game._pop()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if alpha >= beta:
+                        break
+
+        # a player with no legal moves has lost, by checkmate or by stalemate
+        if legal_moves == 0:
+            return -MATE_SCORE + ply
+
+        if best_score <= original_alpha:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        stored_score = best_score
+        if stored_score > MATE_SCORE - MAX_PLY:
+            stored_score += ply
+        elif stored_score < -MATE_SCORE + MAX_PLY:
+            stored_score -= ply
+        self._table.store(position_hash, depth, stored_score, bound, best_move)
+        return best_score
+
+    def _quiescence(self, alpha, beta, ply):
+        """
+        Returns the score of the current position searching captures only, so that the static evaluation
+        is never taken in the middle of an exchange
+        """
+        game = self._game
+        self._count_node()
+        self._pv[ply] = []
+
+        stand_pat = evaluate(game)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        color = game.get_player_turn()
+        board = game._board
+        check_squares = game._check_squares(color)
+        for move in self._ordered_moves(color, None):
+            if board[move[1]] is None:
+                break
+            game._push(move[0], move[1])
+            if (check_squares >> move[0] & 1 or check_squares >> move[1] & 1) and game.is_in_check(color):
+                game._pop()
+                continue
+            score = -self._quiescence(-beta, -alpha, ply + 1)
+            game._pop()
+
+            if score > alpha:
+                alpha = score
+                self._pv[ply] = [move] + self._pv[ply + 1]
+                if alpha >= beta:
+                    break
+        return alpha
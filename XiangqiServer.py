@@ -0,0 +1,260 @@
+# Date: 10/18/2026
+# Description: asyncio server hosting many concurrent XiangqiGames over a line protocol.
+# Writes class XiangqiServer. Clients connect over TCP and send one command per line; each game lives in the
+# server under a numeric ID. The work that can take long - checking a move and whether it ends the game, and
+# searching - runs in a concurrent.futures.ProcessPoolExecutor on the position packed by XiangqiGame._pack, so the
+# event loop only parses commands and applies results and never waits on the rules code. Commands for the same
+# game are applied in the order they were received, while commands for different games run concurrently, also
+# on a single connection. Games are played under the repetition rules of XiangqiGame.set_repetition_rules, so a
+# game that keeps repeating ends in a draw, or in a loss for a player who keeps checking or chasing.
+#
+# Commands and their answers, one line each:
+#   new [fen]                       ok <id>
+#   move <id> <from> <to>           ok <id> <game state>, or illegal <id>
+#   state <id>                      ok <id> <game state> <player turn>
+#   fen <id>                        ok <id> <fen>
+#   search <id> <depth> [time ms]   ok <id> <from> <to> <score>, or ok <id> none if there is no legal move;
+#                                   the time limit defaults to DEFAULT_SEARCH_TIME_MS
+#   close <id>                      ok <id>
+#   quit                            bye, then the connection is closed
+# A command that cannot be carried out is answered with error <id or -> <reason>. Commands must be ASCII, and a
+# line longer than the stream limit (64 KiB) is answered with an error and ends the connection.
+# Usage: python XiangqiServer.py [port] [workers]
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from XiangqiGame import XiangqiGame
+from XiangqiSearch import XiangqiSearch, MAX_PLY
+
+DEFAULT_PORT = 7878
+# a search holds its game's lock and a worker, so it is always bounded in time
+DEFAULT_SEARCH_TIME_MS = 5000
+
+
+def _move_worker(packed, from_square, to_square):
+    """
+    Returns (legal, game state after the move) for the move on the packed position; game state is None
+    if the move is not legal
+    """
+    game = XiangqiGame._unpack(packed)
+    if not game.make_move(from_square, to_square):
+        return False, None
+    return True, game.get_game_state()
+
+
+def _state_worker(packed):
+    """
+    Returns the game state of the packed position
+    """
+    return XiangqiGame._unpack(packed).get_game_state()
+
+
+def _search_worker(packed, depth, time_limit):
+    """
+    Returns (best_move, score) for the packed position searched to depth plies or for time_limit seconds
+    """
+    best_move, score, pv = XiangqiSearch(XiangqiGame._unpack(packed)).search(max_depth=depth, time_limit=time_limit)
+    return best_move, score
+
+
+class XiangqiServer:
+    """
+    Represents a game server with _games, _locks, _next_id and _executor data members.
+    _games maps a game ID to its XiangqiGame and _locks maps it to the asyncio.Lock that keeps the game's commands
+    in order; _executor is the pool the rules and search work is sent to
+    """
+
+    def __init__(self, workers=None, executor=None):
+        """
+        Returns a XiangqiServer with no games, sending work to executor, or to a new pool of workers processes
+        (os.cpu_count() by default)
+        """
+        self._games = {}
+        self._locks = {}
+        self._next_id = 1
+        self._executor = executor or ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+
+    def get_game(self, game_id):
+        """
+        Returns the XiangqiGame with game_id, or None
+        """
+        return self._games.get(game_id)
+
+    def close(self):
+        """
+        Shuts down the worker pool
+        """
+        self._executor.shutdown()
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """
+        Starts listening on host and port (0 picks a free port) and returns the asyncio.Server
+        """
+        return await asyncio.start_server(self._serve_client, host, port)
+
+    async def _serve_client(self, reader, writer):
+        """
+        Reads the commands of one connection and answers each when it is done, running commands concurrently
+        """
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the rest of a line over the stream limit cannot be told from the next command, so the
+                    # connection is closed after answering
+                    writer.write(b"error - line too long\n")
+                    break
+                if not line:
+                    break
+                line = line.decode("ascii", "replace").strip()
+                if line == "quit":
+                    break
+                if line:
+                    # the task is created, and so queues for its game's lock, in the order the lines arrived
+                    task = asyncio.ensure_future(self._answer(line, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.wait(pending)
+            if not writer.is_closing():
+                writer.write(b"bye\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, line, writer):
+        """
+        Runs the command on line and writes its answer
+        """
+        answer = await self.execute(line)
+        if not writer.is_closing():
+            writer.write(answer.encode("ascii") + b"\n")
+            await writer.drain()
+
+    async def execute(self, line):
+        """
+        Runs the command on line and returns its answer, without the newline
+        """
+        if not line.isascii():
+            return "error - command is not ASCII"
+        words = line.split()
+        command = words[0] if words else ""
+        if command == "new":
+            return self._new_game(" ".join(words[1:]))
+        if command not in ("move", "state", "fen", "search", "close"):
+            return "error - unknown command %s" % command
+        if len(words) < 2 or not words[1].isdigit():
+            return "error - missing game id"
+        game_id = int(words[1])
+        lock = self._locks.get(game_id)
+        if lock is None:
+            return "error %d no such game" % game_id
+
+        async with lock:
+            game = self._games.get(game_id)
+            if game is None:
+                return "error %d no such game" % game_id
+            if command == "move":
+                if len(words) != 4:
+                    return "error %d usage: move <id> <from> <to>" % game_id
+                return await self._move(game_id, game, words[2], words[3])
+            if command == "state":
+                return "ok %d %s %s" % (game_id, await self._game_state(game), game.get_player_turn())
+            if command == "fen":
+                return "ok %d %s" % (game_id, game.to_fen())
+            if command == "search":
+                return await self._search(game_id, game, words[2:])
+            del self._games[game_id]
+            del self._locks[game_id]
+            return "ok %d" % game_id
+
+    def _new_game(self, fen):
+        """
+        Adds a game at the position of fen, or at the opening position, and returns the answer naming its ID
+        """
+        if fen:
+            try:
+                game = XiangqiGame.from_fen(fen)
+            except ValueError as error:
+                return "error - %s" % error
+        else:
+            game = XiangqiGame()
+        game.set_repetition_rules()
+        game_id = self._next_id
+        self._next_id += 1
+        self._games[game_id] = game
+        self._locks[game_id] = asyncio.Lock()
+        return "ok %d" % game_id
+
+    async def _run(self, function, *arguments):
+        """
+        Returns the result of function(*arguments) run on the worker pool
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *arguments)
+
+    async def _game_state(self, game):
+        """
+        Returns game's state, computing it on the worker pool if the game has not computed it yet
+        """
+        if game.get_known_game_state() is None:
+            game._set_game_state(await self._run(_state_worker, game._pack()))
+        return game.get_game_state()
+
+    async def _move(self, game_id, game, from_square, to_square):
+        """
+        Checks the move on the worker pool and makes it in game if it is legal. No move is legal once the game is
+        over, which for a game ended by repetition only the game's own history shows, so the state is checked first
+        """
+        if await self._game_state(game) != "UNFINISHED":
+            return "illegal %d" % game_id
+        legal, game_state = await self._run(_move_worker, game._pack(), from_square, to_square)
+        if not legal:
+            return "illegal %d" % game_id
+        game.push((from_square, to_square))
+        # the worker has already found the state of the new position, except for repetitions, which the game adds
+        game._set_game_state(game_state)
+        return "ok %d %s" % (game_id, game.get_game_state())
+
+    async def _search(self, game_id, game, arguments):
+        """
+        Searches game's position on the worker pool to the depth and time limit in arguments, with the depth
+        clamped to the search's ply limit and the time limit DEFAULT_SEARCH_TIME_MS if not given
+        """
+        if not arguments or not all(argument.isdigit() for argument in arguments[:2]):
+            return "error %d usage: search <id> <depth> [time ms]" % game_id
+        depth = max(1, min(int(arguments[0]), MAX_PLY - 1))
+        time_limit = (int(arguments[1]) if len(arguments) > 1 else DEFAULT_SEARCH_TIME_MS) / 1000
+        best_move, score = await self._run(_search_worker, game._pack(), depth, time_limit)
+        if best_move is None:
+            return "ok %d none" % game_id
+        return "ok %d %s %s %d" % (game_id, best_move[0], best_move[1], score)
+
+
+async def serve(port=DEFAULT_PORT, workers=None):
+    """
+    Runs a XiangqiServer on port until cancelled
+    """
+    server = XiangqiServer(workers)
+    listener = await server.start(port=port)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    asyncio.run(serve(port, workers))
+
+
+if __name__ == '__main__':
+    main()
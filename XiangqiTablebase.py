@@ -0,0 +1,400 @@
+# Date: 10/18/2026
+# Description: Retrograde endgame tablebases for XiangqiGame.
+# Writes function generate_tablebase and material_key and class Tablebase. generate_tablebase solves every
+# position of a material set, such as 'KRkaa' (red General and Chariot against black General and two Advisors),
+# by retrograde analysis: the legal moves of each position are generated once with XiangqiGame's own rules, so
+# that facing Generals, Cannon screens and Horse legs count exactly as in play, and results are then passed back
+# from the positions with no legal moves to their predecessors in order of distance to mate. Captures lead into
+# the tables of the smaller material sets, which are solved and written first. Tablebase memory-maps the files
+# written and answers a position of tablebase material, or of the same material with colours swapped, with a
+# table lookup instead of a search.
+# Every position is kept in memory while a table is solved, so material sets of more than three or four pieces
+# besides the Generals take long to generate in pure Python.
+#
+# File layout, all integers little-endian:
+#   header   magic b"XQTB", version (u16), reserved (u16), material key (16 bytes, ASCII, NUL padded),
+#            entry count (u64)
+#   entries  one byte per position: 0 for a draw, 255 for a position that cannot occur (two pieces on one square,
+#            or the side not to move in check), and otherwise the number of plies to mate plus one, which is odd
+#            for a position the side to move loses and even for one it wins
+# A position's entry number counts over the squares each piece can stand on, General first and red first, in the
+# order of the material key, with the side to move (0 red, 1 black) as the last digit.
+
+import mmap
+import os
+import struct
+
+from XiangqiBitboard import GENERAL_MOVES, ADVISOR_MOVES, ELEPHANT_TARGETS, SOLDIER_MOVES, GENERAL, ELEPHANT, \
+    ADVISOR, SOLDIER
+from XiangqiGame import XiangqiGame, PIECES, SQUARE_NAMES, FEN_LETTERS
+
+MAGIC = b"XQTB"
+VERSION = 1
+TABLE_HEADER = struct.Struct("<4sHH16sQ")
+KEY_LENGTH = 16
+EXTENSION = ".xqtb"
+DRAW = 0
+ILLEGAL = 0xFF
+# the longest distance to mate, in plies, an entry can hold
+MAX_PLIES = 253
+COLORS = ("red", "black")
+
+
+def material_key(game):
+    """
+    Returns the material of game's position as a key such as 'KRkaa': the FEN letters of red's pieces in upper
+    case followed by black's in lower case, each in the order General, Advisor, Elephant, Horse, Chariot, Cannon,
+    Soldier
+    """
+    position = game._position
+    return _key({color: [position.get_pieces(color, kind).bit_count() for kind in range(7)] for color in COLORS})
+
+
+def _key(counts):
+    """
+    Returns the material key for counts, a dict mapping each color to its number of pieces of each kind
+    """
+    return "".join(FEN_LETTERS[kind].upper() * counts["red"][kind] for kind in range(7)) + \
+        "".join(FEN_LETTERS[kind] * counts["black"][kind] for kind in range(7))
+
+
+def _counts(key):
+    """
+    Returns the per-color piece counts of the material key. Raises ValueError if key is not a material key with
+    one General of each color
+    """
+    counts = {color: [0] * 7 for color in COLORS}
+    for letter in key:
+        if letter.lower() not in FEN_LETTERS:
+            raise ValueError("not a material key: %r" % key)
+        counts["red" if letter.isupper() else "black"][FEN_LETTERS.index(letter.lower())] += 1
+    if _key(counts) != key or counts["red"][GENERAL] != 1 or counts["black"][GENERAL] != 1 or \
+            len(key) > KEY_LENGTH:
+        raise ValueError("not a material key: %r" % key)
+    return counts
+
+
+def _mirror_key(key):
+    """
+    Returns the material key with the colors swapped
+    """
+    red = "".join(letter for letter in key if letter.isupper())
+    black = "".join(letter for letter in key if letter.islower())
+    return black.upper() + red.lower()
+
+
+def _mirror(square):
+    """
+    Returns the square reflected across the river, where the other color's piece would stand
+    """
+    return (9 - square // 9) * 9 + square % 9
+
+
+def _domain(color, kind):
+    """
+    Returns the sorted list of squares color's piece of kind can stand on
+    """
+    if kind == GENERAL:
+        return [square for square in range(90) if GENERAL_MOVES[color][square]]
+    if kind == ADVISOR:
+        return [square for square in range(90) if ADVISOR_MOVES[color][square]]
+    if kind == ELEPHANT:
+        return [square for square in range(90) if ELEPHANT_TARGETS[color][square]]
+    if kind == SOLDIER:
+        # Soldiers never step back, so only the squares reachable from their starting points
+        reached = {row * 9 + column for row in ((3,) if color == "red" else (6,)) for column in (0, 2, 4, 6, 8)}
+        frontier = list(reached)
+        while frontier:
+            square = frontier.pop()
+            for target in range(90):
+                if SOLDIER_MOVES[color][square] >> target & 1 and target not in reached:
+                    reached.add(target)
+                    frontier.append(target)
+        return sorted(reached)
+    return list(range(90))
+
+
+class _Layout:
+    """
+    Represents the entry numbering of one material key with _key, _pieces, _domains, _slots, _strides and _size
+    data members.
+    _pieces lists the (color, kind) of each piece in key order, _domains the squares each piece can stand on,
+    _slots[piece][square] the digit of square in the piece's domain or -1, and _strides[piece] the entry number
+    step of one digit; _size is the number of entries
+    """
+
+    def __init__(self, key):
+        """
+        Returns the _Layout of the material key. Raises ValueError if key is not a material key
+        """
+        counts = _counts(key)
+        self._key = key
+        self._pieces = [(color, kind) for color in COLORS for kind in range(7) for count in range(counts[color][kind])]
+        self._domains = [_domain(color, kind) for color, kind in self._pieces]
+        self._slots = []
+        for domain in self._domains:
+            slots = [-1] * 90
+            for digit, square in enumerate(domain):
+                slots[square] = digit
+            self._slots.append(slots)
+        self._strides = [0] * len(self._pieces)
+        stride = 2
+        for piece in range(len(self._pieces) - 1, -1, -1):
+            self._strides[piece] = stride
+            stride *= len(self._domains[piece])
+        self._size = stride
+
+    def index(self, position, color, mirror=False):
+        """
+        Returns the entry number of position with color to move, reading each piece of the table from the other
+        color's pieces reflected across the river if mirror is True, or None if a piece stands off its domain
+        """
+        index = 0 if (color == "red") != mirror else 1
+        bitboards = {}
+        for piece, (piece_color, kind) in enumerate(self._pieces):
+            if mirror:
+                piece_color = "black" if piece_color == "red" else "red"
+            bitboard = bitboards.get((piece_color, kind))
+            if bitboard is None:
+                bitboard = position.get_pieces(piece_color, kind)
+            bit = bitboard & -bitboard
+            bitboards[(piece_color, kind)] = bitboard ^ bit
+            square = bit.bit_length() - 1
+            digit = self._slots[piece][_mirror(square) if mirror else square]
+            if digit < 0:
+                return None
+            index += digit * self._strides[piece]
+        return index
+
+
+def generate_tablebase(directory, key):
+    """
+    Solves the material key, for example 'KRkaa', and every material set its captures lead to, writes each table
+    to directory as <key>.xqtb and returns the list of keys written, smallest material first.
+    Raises ValueError if key is not a material key with one General of each color, or if a position is more
+    than MAX_PLIES plies from mate
+    """
+    tables = {}
+    _solve_with_captures(key, tables)
+    for table_key, (layout, values) in tables.items():
+        with open(os.path.join(directory, table_key + EXTENSION), "wb") as table_file:
+            table_file.write(TABLE_HEADER.pack(MAGIC, VERSION, 0, table_key.encode("ascii"), layout._size))
+            table_file.write(values)
+    return list(tables)
+
+
+def _solve_with_captures(key, tables):
+    """
+    Solves key into tables, a dict mapping material keys to (layout, entries), after the material sets one capture
+    away from it
+    """
+    if key in tables:
+        return
+    counts = _counts(key)
+    for color in COLORS:
+        for kind in range(1, 7):
+            if counts[color][kind]:
+                counts[color][kind] -= 1
+                _solve_with_captures(_key(counts), tables)
+                counts[color][kind] += 1
+    layout = _Layout(key)
+    tables[key] = (layout, _solve(layout, tables))
+
+
+def _solve(layout, tables):
+    """
+    Returns the entries of layout's table as a bytearray, reading the results of captures from tables
+    """
+    size = layout._size
+    pieces = layout._pieces
+    domains = layout._domains
+    slots = layout._slots
+    strides = layout._strides
+    values = bytearray([ILLEGAL]) * size
+    remaining = [0] * size
+    predecessors = [[] for index in range(size)]
+    # resolved[plies] holds the positions found to be that many plies from mate, and captures[plies] the
+    # (position, capture leads to a loss) pairs of captures into positions that many plies from mate
+    resolved = [[] for plies in range(MAX_PLIES + 2)]
+    captures = [[] for plies in range(MAX_PLIES + 2)]
+    game = XiangqiGame.__new__(XiangqiGame)
+
+    # forward pass: find the legal positions and link each to the positions its moves lead to
+    for flat in range(0, size, 2):
+        squares = []
+        rest = flat // 2
+        for piece in range(len(pieces) - 1, -1, -1):
+            rest, digit = divmod(rest, len(domains[piece]))
+            squares.append(domains[piece][digit])
+        squares.reverse()
+        if len(set(squares)) < len(squares):
+            continue
+        game._set_position({square: PIECES[color][kind] for square, (color, kind) in zip(squares, pieces)}, "red")
+        piece_on = {square: piece for piece, square in enumerate(squares)}
+
+        for side, color in enumerate(COLORS):
+            index = flat + side
+            game._player_turn = color
+            if game.is_in_check("black" if color == "red" else "red"):
+                continue
+            values[index] = DRAW
+            moves = game._generate_legal_moves(color)
+            for from_index, to_index in moves:
+                if game._board[to_index] is None:
+                    piece = piece_on[from_index]
+                    child = flat + (slots[piece][to_index] - slots[piece][from_index]) * strides[piece] + 1 - side
+                    predecessors[child].append(index)
+                    continue
+                game._push(from_index, to_index)
+                child_layout, child_values = tables[material_key(game)]
+                child_value = child_values[child_layout.index(game._position, game._player_turn)]
+                game._pop()
+                if child_value != DRAW:
+                    captures[child_value - 1].append((index, child_value % 2 == 1))
+            # a capture into a draw is never counted off, so the position can never be lost
+            remaining[index] = len(moves)
+            if not moves:
+                values[index] = 1
+                resolved[0].append(index)
+
+    # backward pass: a position is won as soon as one move leads to a lost position, and lost once every move
+    # leads to a won position; taking distances in increasing order keeps wins as short and losses as long as
+    # the best defence allows
+    for plies in range(MAX_PLIES + 1):
+        events = captures[plies]
+        for child in resolved[plies]:
+            child_lost = values[child] % 2 == 1
+            events.extend((parent, child_lost) for parent in predecessors[child])
+        for parent, child_lost in events:
+            if values[parent] != DRAW:
+                continue
+            if not child_lost:
+                remaining[parent] -= 1
+                if remaining[parent]:
+                    continue
+            if plies == MAX_PLIES:
+                raise ValueError("%s has a position more than %d plies from mate" % (layout._key, MAX_PLIES))
+            values[parent] = plies + 2
+            resolved[plies + 1].append(parent)
+    return values
+
+
+class Tablebase:
+    """
+    Represents the tablebase files in a directory with _directory, _paths and _tables data members.
+    _paths maps each material key found to its file, and _tables maps the keys probed so far to their open
+    (file, map, layout). Use as a context manager, or call close when done
+    """
+
+    def __init__(self, directory):
+        """
+        Returns a Tablebase over the .xqtb files in directory; files are opened and memory-mapped when first probed
+        """
+        self._directory = directory
+        self._paths = {}
+        self._tables = {}
+        for name in os.listdir(directory):
+            if name.endswith(EXTENSION):
+                self._paths[name[:-len(EXTENSION)]] = os.path.join(directory, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_keys(self):
+        """
+        Returns the sorted list of material keys with a table
+        """
+        return sorted(self._paths)
+
+    def get_max_pieces(self):
+        """
+        Returns the number of pieces, Generals included, of the largest material set with a table
+        """
+        return max((len(key) for key in self._paths), default=0)
+
+    def close(self):
+        """
+        Unmaps and closes the files opened so far
+        """
+        for table_file, table_map, layout in self._tables.values():
+            table_map.close()
+            table_file.close()
+        self._tables = {}
+
+    def _open(self, key):
+        """
+        Returns the (file, map, layout) of key's table, opening it if needed.
+        Raises ValueError if the file is not a tablebase file for key
+        """
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+        path = self._paths[key]
+        layout = _Layout(key)
+        table_file = open(path, "rb")
+        try:
+            table_map = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            table_file.close()
+            raise ValueError("%s is not a tablebase file" % path)
+        if len(table_map) != TABLE_HEADER.size + layout._size:
+            table_map.close()
+            table_file.close()
+            raise ValueError("%s is not a tablebase file for %s" % (path, key))
+        magic, version, reserved, table_key, entry_count = TABLE_HEADER.unpack_from(table_map, 0)
+        if magic != MAGIC or version != VERSION or table_key.rstrip(b"\0") != key.encode("ascii"):
+            table_map.close()
+            table_file.close()
+            raise ValueError("%s is not a version %d tablebase file for %s" % (path, VERSION, key))
+        self._tables[key] = table_file, table_map, layout
+        return self._tables[key]
+
+    def probe(self, game):
+        """
+        Returns (result, plies) for game's position: result is 1 if the side to move wins, -1 if it loses and 0
+        if the position is drawn, and plies is the number of plies to mate with best play, 0 for a draw.
+        Returns None if there is no table for the position's material
+        """
+        key = material_key(game)
+        mirror = key not in self._paths
+        if mirror:
+            key = _mirror_key(key)
+            if key not in self._paths:
+                return None
+        table_file, table_map, layout = self._open(key)
+        index = layout.index(game._position, game._player_turn, mirror)
+        if index is None:
+            return None
+        value = table_map[TABLE_HEADER.size + index]
+        if value == ILLEGAL:
+            return None
+        if value == DRAW:
+            return 0, 0
+        return (-1 if value % 2 == 1 else 1), value - 1
+
+    def best_move(self, game):
+        """
+        Returns the move of game's position that keeps the best result, winning in the fewest or losing in the
+        most plies, as a (from_square, to_square) tuple, or None if the position is not in the tablebase or has no
+        legal move
+        """
+        if self.probe(game) is None:
+            return None
+        best_move = None
+        best_score = None
+        for from_index, to_index in game._generate_legal_moves(game._player_turn):
+            game._push(from_index, to_index)
+            child = self.probe(game)
+            game._pop()
+            if child is None:
+                continue
+            result, plies = child
+            # the reply's result is the other player's: a loss in fewer plies is better, a win in more plies
+            score = -result * (MAX_PLIES + 1 - plies) if result else 0
+            if best_score is None or score > best_score:
+                best_move = SQUARE_NAMES[from_index], SQUARE_NAMES[to_index]
+                best_score = score
+        return best_move
@@ -0,0 +1,247 @@
+# Date: 10/18/2026
+# Description: UCCI engine front end for XiangqiGame over stdin and stdout.
+# Writes class UCCIEngine, which reads UCCI commands line by line and answers them, so that xiangqi GUIs and
+# match managers can run XiangqiSearch as an engine. Searches run in a background thread while the main thread
+# keeps reading commands, so a stop or quit received during a search ends it at the next node instead of
+# waiting for the search budget to run out.
+# Supported commands: ucci, isready, setoption (accepted and ignored), position {startpos | fen <fen>}
+# [moves <moves>], banmoves, go [ponder | draw] [depth <d> | nodes <n> | time <t> [movestogo <m> | increment <i>]
+# [opptime ...]], ponderhit, stop and quit. Times are in milliseconds; ponderhit ends a ponder search like stop.
+# UCCI moves name squares by file a-i and rank 0-9 from red's side, so UCCI h2e2 is the move ('h3', 'e3').
+# Usage: python XiangqiUCCI.py
+
+import sys
+import threading
+import time
+
+from XiangqiGame import XiangqiGame, STARTING_FEN
+from XiangqiSearch import XiangqiSearch, MATE_SCORE, MAX_PLY
+
+ENGINE_NAME = "XiangqiGame"
+
+# share of the remaining time given to one move when the GUI does not say how many moves are left
+DEFAULT_MOVES_TO_GO = 30
+
+
+def from_ucci_move(move):
+    """
+    Returns the UCCI move string, for example 'h2e2', as a (from_square, to_square) tuple, for example ('h3', 'e3'),
+    or None if it is not a move between two squares on the board
+    """
+    if len(move) != 4 or move[0] not in "abcdefghi" or move[2] not in "abcdefghi" or \
+            not move[1].isdigit() or not move[3].isdigit():
+        return None
+    return move[0] + str(int(move[1]) + 1), move[2] + str(int(move[3]) + 1)
+
+
+def to_ucci_move(move):
+    """
+    Returns the (from_square, to_square) move as a UCCI move string
+    """
+    return "".join(square[0] + str(int(square[1:]) - 1) for square in move)
+
+
+class UCCIEngine:
+    """
+    Represents a UCCI engine session with _input, _output, _game, _search, _search_thread, _banned_moves and
+    _output_lock data members.
+    _input and _output are the text streams commands are read from and answers written to, and _output_lock
+    keeps the lines written by the search thread and by the command loop whole
+    """
+
+    def __init__(self, input_stream=None, output_stream=None):
+        """
+        Returns a UCCIEngine reading from input_stream and writing to output_stream, stdin and stdout by default,
+        at the opening position
+        """
+        self._input = input_stream or sys.stdin
+        self._output = output_stream or sys.stdout
+        self._game = XiangqiGame()
+        self._search = XiangqiSearch(self._game)
+        self._search_thread = None
+        self._banned_moves = []
+        self._output_lock = threading.Lock()
+
+    def run(self):
+        """
+        Answers commands until quit or the end of the input, then waits for any search still running to finish
+        """
+        for line in self._input:
+            if not self.handle(line):
+                return
+        self._wait_for_search()
+
+    def _send(self, line):
+        """
+        Writes line to the output and flushes it, so that the GUI sees it at once
+        """
+        with self._output_lock:
+            self._output.write(line + "\n")
+            self._output.flush()
+
+    def handle(self, line):
+        """
+        Answers the command on line; returns False for quit and True otherwise.
+        Commands other than stop, quit and isready wait for a running search to finish first
+        """
+        words = line.split()
+        if not words:
+            return True
+        command = words[0]
+
+        if command in ("stop", "ponderhit"):
+            self._stop_search()
+        elif command == "quit":
+            self._stop_search()
+            self._send("bye")
+            return False
+        elif command == "isready":
+            self._send("readyok")
+        elif command == "ucci":
+            self._send("id name " + ENGINE_NAME)
+            self._send("ucciok")
+        else:
+            self._wait_for_search()
+            if command == "position":
+                self._set_position(words[1:])
+            elif command == "banmoves":
+                self._banned_moves = [from_ucci_move(move) for move in words[1:]]
+            elif command == "go":
+                self._go(words[1:])
+        return True
+
+    def _set_position(self, arguments):
+        """
+        Sets up the position of a position command from its arguments; moves after the first illegal one
+        are ignored
+        """
+        if "moves" in arguments:
+            moves_at = arguments.index("moves")
+            moves = [from_ucci_move(move) for move in arguments[moves_at + 1:]]
+            arguments = arguments[:moves_at]
+        else:
+            moves = []
+        if arguments and arguments[0] == "fen":
+            try:
+                game = XiangqiGame.from_fen(" ".join(arguments[1:]))
+            except ValueError:
+                return
+        elif arguments and arguments[0] == "startpos":
+            game = XiangqiGame.from_fen(STARTING_FEN)
+        else:
+            return
+        if None in moves:
+            moves = moves[:moves.index(None)]
+        game.replay(moves, "light")
+
+        self._game = game
+        self._search = XiangqiSearch(game)
+        self._banned_moves = []
+
+    def _go(self, arguments):
+        """
+        Starts a search for a go command in the background; the search thread writes its bestmove when done
+        """
+        max_depth = 64
+        node_limit = None
+        time_limit = None
+        ponder = False
+        values = {}
+        for index, word in enumerate(arguments):
+            if word == "ponder":
+                ponder = True
+            elif word in ("depth", "nodes", "time", "movestogo", "increment") and index + 1 < len(arguments) and \
+                    arguments[index + 1].isdigit():
+                values[word] = arguments[index + 1]
+        if "depth" in values:
+            max_depth = max(1, min(int(values["depth"]), MAX_PLY - 1))
+        if "nodes" in values:
+            node_limit = int(values["nodes"])
+        if "time" in values:
+            remaining = int(values["time"])
+            moves_to_go = int(values.get("movestogo", DEFAULT_MOVES_TO_GO))
+            increment = int(values.get("increment", 0))
+            # never plan to use more than half of the time left on one move
+            time_limit = min(remaining / max(moves_to_go, 1) + increment, remaining / 2) / 1000
+        if ponder:
+            # a ponder search runs until ponderhit or stop
+            time_limit = None
+
+        self._search_thread = threading.Thread(target=self._run_search, args=(max_depth, node_limit, time_limit),
+                                               daemon=True)
+        self._search_thread.start()
+
+    def _run_search(self, max_depth, node_limit, time_limit):
+        """
+        Runs the search on the search thread, writing an info line per completed iteration and then the bestmove
+        """
+        start = time.perf_counter()
+        search = self._search
+        game = self._game
+
+        def report(depth, score, pv):
+            elapsed = int((time.perf_counter() - start) * 1000)
+            self._send("info depth %d score %d nodes %d time %d pv %s"
+                       % (depth, score, search.get_nodes(), elapsed, " ".join(to_ucci_move(move) for move in pv)))
+
+        if self._banned_moves:
+            best_move = self._search_without_banned_moves(max_depth, node_limit, time_limit)
+        else:
+            best_move, score, pv = search.search(max_depth, node_limit, time_limit, callback=report)
+            if len(pv) > 1 and abs(score) < MATE_SCORE - MAX_PLY:
+                self._send("bestmove %s ponder %s" % (to_ucci_move(best_move), to_ucci_move(pv[1])))
+                return
+        if best_move is None or game.get_game_state() != "UNFINISHED":
+            self._send("nobestmove")
+        else:
+            self._send("bestmove " + to_ucci_move(best_move))
+
+    def _search_without_banned_moves(self, max_depth, node_limit, time_limit):
+        """
+        Returns the best move that is not banned by the last banmoves command, searching the position after each
+        allowed move, or None if every legal move is banned
+        """
+        game = self._game
+        allowed = [move for move in game.get_legal_moves() if move not in self._banned_moves]
+        if len(allowed) <= 1:
+            return allowed[0] if allowed else None
+        search = self._search
+        best_move = allowed[0]
+        best_score = -MATE_SCORE - 1
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        for move in allowed:
+            move_time = None if deadline is None else max(deadline - time.perf_counter(), 0) / len(allowed)
+            game.make_move(move[0], move[1])
+            reply, score, pv = search.search(max(max_depth - 1, 1), node_limit, move_time)
+            game.pop()
+            if -score > best_score:
+                best_move, best_score = move, -score
+            if search._stopped:
+                break
+        return best_move
+
+    def _stop_search(self):
+        """
+        Stops a running search and waits for it to write its bestmove
+        """
+        thread = self._search_thread
+        while thread is not None and thread.is_alive():
+            self._search.stop()
+            thread.join(0.01)
+        self._search_thread = None
+
+    def _wait_for_search(self):
+        """
+        Waits for a running search to finish
+        """
+        if self._search_thread is not None:
+            self._search_thread.join()
+            self._search_thread = None
+
+
+def main():
+    UCCIEngine().run()
+
+
+if __name__ == '__main__':
+    main()